@@ -1,4 +1,6 @@
-from src.refinery_problem import model
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 from src.refinery_problem import helpers
 from src.case_studies import case_study_00
 from src.case_studies import case_study_01
@@ -10,64 +12,52 @@ from src.case_studies import case_study_06
 from src.case_studies import case_study_07
 from src.case_studies import case_study_08
 
+# case study modules indexed by case number (0 = base case, 8 = all tanks)
+CASE_STUDIES = (
+    case_study_00,
+    case_study_01,
+    case_study_02,
+    case_study_03,
+    case_study_04,
+    case_study_05,
+    case_study_06,
+    case_study_07,
+    case_study_08
+)
 
-def main():
-    # initialize refinery model and instantiate the models
-    refinery_object = model.RefineryModel()
-    refinery_problem_cs_00 = refinery_object.build_model()
-    refinery_problem_cs_01 = refinery_object.build_model()
-    refinery_problem_cs_02 = refinery_object.build_model()
-    refinery_problem_cs_03 = refinery_object.build_model()
-    refinery_problem_cs_04 = refinery_object.build_model()
-    refinery_problem_cs_05 = refinery_object.build_model()
-    refinery_problem_cs_06 = refinery_object.build_model()
-    refinery_problem_cs_07 = refinery_object.build_model()
-    refinery_problem_cs_08 = refinery_object.build_model()
-
-    # base case
-    optimization_cs_00, cs_00_results_df = case_study_00.execute_optimization(refinery_problem_cs_00)
-    cs_00_results_df.to_csv('./results/case_study_00.csv', index=True, header=True)
-    helpers.plot_charts(cs_00_results_df, 0)
 
-    # case study 1
-    optimization_cs_01, cs_01_results_df = case_study_01.execute_optimization(refinery_problem_cs_01)
-    cs_01_results_df.to_csv('./results/case_study_01.csv', index=True, header=True)
-    helpers.plot_charts(cs_01_results_df, 1)
+def run_case_study(case_number):
+    """
+    Run the shutdown scenarios of a single case study on the base model of the worker process.
+    Returns the results dataframe. Used as the worker function of the process pool in main.
+    """
+    results_df = CASE_STUDIES[case_number].execute_optimization()
 
-    # case study 2
-    optimization_cs_02, cs_02_results_df = case_study_02.execute_optimization(refinery_problem_cs_02)
-    cs_02_results_df.to_csv('./results/case_study_02.csv', index=True, header=True)
-    helpers.plot_charts(cs_02_results_df, 2)
+    return results_df
 
-    # case study 3
-    optimization_cs_03, cs_03_results_df = case_study_03.execute_optimization(refinery_problem_cs_03)
-    cs_03_results_df.to_csv('./results/case_study_03.csv', index=True, header=True)
-    helpers.plot_charts(cs_03_results_df, 3)
 
-    # case study 4
-    optimization_cs_04, cs_04_results_df = case_study_04.execute_optimization(refinery_problem_cs_04)
-    cs_04_results_df.to_csv('./results/case_study_04.csv', index=True, header=True)
-    helpers.plot_charts(cs_04_results_df, 4)
+def write_results_csv(case_number, results_df):
+    """Write the results dataframe of a single case study to its CSV file."""
+    results_df.to_csv(f'./results/case_study_0{case_number}.csv', index=True, header=True)
 
-    # case study 5
-    optimization_cs_05, cs_05_results_df = case_study_05.execute_optimization(refinery_problem_cs_05)
-    cs_05_results_df.to_csv('./results/case_study_05.csv', index=True, header=True)
-    helpers.plot_charts(cs_05_results_df, 5)
 
-    # case study 6
-    optimization_cs_06, cs_06_results_df = case_study_06.execute_optimization(refinery_problem_cs_06)
-    cs_06_results_df.to_csv('./results/case_study_06.csv', index=True, header=True)
-    helpers.plot_charts(cs_06_results_df, 6)
+def main():
+    # the case studies are independent, so solve them in parallel (one process per case study)
+    # this is the only level of parallelism - each worker solves the scenarios of its case study one after another
+    # each worker builds its base model on its first case study and reuses it for the rest (get_base_model)
+    # (a built model cannot be pickled to the workers, since its rules are closures, so it is not built up front)
+    with ProcessPoolExecutor(max_workers=min(len(CASE_STUDIES), os.cpu_count() or 1)) as executor:
+        futures = {case_number: executor.submit(run_case_study, case_number) for case_number in range(len(CASE_STUDIES))}
+        results = {case_number: future.result() for case_number, future in futures.items()}
 
-    # case study 7
-    optimization_cs_07, cs_07_results_df = case_study_07.execute_optimization(refinery_problem_cs_07)
-    cs_07_results_df.to_csv('./results/case_study_07.csv', index=True, header=True)
-    helpers.plot_charts(cs_07_results_df, 7)
+    # write all of the CSV files as one batch (pandas releases the GIL while writing)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(write_results_csv, results.keys(), results.values()))
 
-    # case study 8 - all tanks
-    optimization_cs_08, cs_08_results_df = case_study_08.execute_optimization(refinery_problem_cs_08)
-    cs_08_results_df.to_csv('./results/case_study_08.csv', index=True, header=True)
-    helpers.plot_charts(cs_08_results_df, 8)
+    # create the charts in the parent process (matplotlib is not fork-safe), reusing a single figure
+    fig, axs = helpers.create_figure()
+    for case_number, results_df in results.items():
+        helpers.plot_charts(results_df, case_number, fig, axs)
 
     print('Finished Program.')
 
@@ -1,23 +1,32 @@
-import pyomo.environ as pyomo
 from src.refinery_problem import helpers
-import pandas as pd
 
 
-def execute_optimization(opt_model):
-    """Case study #4: only SRN buffer tank before reformer."""
+def fix_tanks(opt_model):
+    """Turn off the RFG, CCG and CCFO buffer tanks (SRN tank available)."""
+
+    # get the timeperiod endpoints once
+    timeperiods = opt_model.timeperiods.ordered_data()
+    t_last = timeperiods[-1]
+    t_step = timeperiods[-1] - timeperiods[-2]
 
-    for t in range(1, opt_model.timeperiods.ordered_data()[-1] + 1, opt_model.timeperiods.ordered_data()[-1] - opt_model.timeperiods.ordered_data()[-2]):
+    # fix the flows into the tanks that are turned off in a single pass over the timeperiods
+    x = opt_model.x
+    for t in range(1, t_last + 1, t_step):
         # SRN tank off
-        # opt_model.x['srn', 'srn_sp', 'srn_tk', t].fix(0)
+        # x['srn', 'srn_sp', 'srn_tk', t].fix(0)
 
         # RFG tank off
-        opt_model.x['rfg', 'rf', 'rfg_tk', t].fix(0)
+        x['rfg', 'rf', 'rfg_tk', t].fix(0)
 
         # CCG tank off
-        opt_model.x['ccg', 'cc', 'ccg_tk', t].fix(0)
+        x['ccg', 'cc', 'ccg_tk', t].fix(0)
 
         # CCFO tank off
-        opt_model.x['ccfo', 'cc', 'ccfo_tk', t].fix(0)
+        x['ccfo', 'cc', 'ccfo_tk', t].fix(0)
+
+
+def execute_optimization():
+    """Case study #4: only SRN buffer tank before reformer."""
 
     # Shutdown scenarios
     shutdown_conditions = {
@@ -33,29 +42,7 @@ def execute_optimization(opt_model):
         10: [('rf', 3), ('cc', 4)]
     }
 
-    output_results_df = pd.DataFrame()
-    # Run all shutdown scenarios and store results in a dataframe column
-    for case, alpha_list in shutdown_conditions.items():
-        # SET Alphas for shutdown scenario
-        for sd_pair in alpha_list:
-            opt_model.alpha[sd_pair[0], sd_pair[1]] = 1
-
-        # Display instance information
-        # opt_model.pprint()
-
-        # Solve optimization problem
-        solver = pyomo.SolverFactory('glpk')
-        solver_information = solver.solve(opt_model, tee=True)
-
-        # Display model results
-        # opt_model.display()
-
-        # Format results into a sorted pandas series and then append to the results dataframe
-        results_series = helpers.store_results_pd(opt_model, solver_information)
-        output_results_df[case] = results_series
-
-        # RESET Alpha
-        for sd_pair in alpha_list:
-            opt_model.alpha[sd_pair[0], sd_pair[1]] = 0
+    # Run all shutdown scenarios in parallel and store results in a dataframe column
+    output_results_df = helpers.execute_scenarios(fix_tanks, shutdown_conditions)
 
-    return opt_model, output_results_df
+    return output_results_df
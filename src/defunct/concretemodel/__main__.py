@@ -1,26 +1,34 @@
 import pyomo.environ as pyomo
+from pyomo.core.expr.numeric_expr import LinearExpression
 import numpy as np
 import pandas as pd
 
+
+def linear_sum(model, streams, coefs):
+    """Build a flat linear expression sum(coefs[k] * x[streams[k]]) in one call instead of term by term."""
+    return LinearExpression(constant=0, linear_coefs=np.asarray(coefs, dtype=float).tolist(), linear_vars=[model.x[i] for i in streams])
+
+
 class RefineryOptimizationConcrete:
     """Class used to create an optimization object, set-up the problem, solve, and output."""
+
+    # solver shared by every instance, created on the first solve
+    _solver = None
+
     def __init__(self):
         """Initialization of data sets"""
 
-        # costs for designated streams (operating costs, material cost, product costs)
-        self.costs = {
-            1: {'cost': -33},
-            2: {'cost': 0.01965},
-            7: {'cost': 0.01965},
-            8: {'cost': -2.5},
-            10: {'cost': -2.2},
-            12: {'cost': -2.2},
-            15: {'cost': 0.01965},
-            33: {'cost': 45.36},
-            34: {'cost': 43.68},
-            35: {'cost': 40.32},
-            36: {'cost': 13.14}
-        }
+        # number of stream ids (streams are numbered 1 to 36, index 0 is unused)
+        n_streams = 37
+
+        # costs for designated streams (operating costs, material cost, product costs), indexed by stream id
+        self.costs = np.zeros(n_streams)
+        self.costs[1] = -33
+        self.costs[[2, 7, 15]] = 0.01965
+        self.costs[8] = -2.5
+        self.costs[[10, 12]] = -2.2
+        self.costs[[33, 34, 35, 36]] = [45.36, 43.68, 40.32, 13.14]
+        self.cost_streams = np.flatnonzero(self.costs).tolist()
 
         # dictionary of each split origin and the respective split streams
         self.split_list = {
@@ -36,83 +44,53 @@ class RefineryOptimizationConcrete:
             13: [31, 32]
         }
 
-        # yield coefficients for each unit operation
+        # yield coefficients for each unit operation, indexed by the outlet stream id
         # Atmospheric Distillation
-        self.ad_yield_coef = {
-            2: {'yield': 35.42},
-            3: {'yield': 0.270},
-            4: {'yield': 0.237},
-            5: {'yield': 0.087},
-            6: {'yield': 0.372}
-        }
+        self.ad_yield_streams = [2, 3, 4, 5, 6]
+        self.ad_yield_coef = np.zeros(n_streams)
+        self.ad_yield_coef[self.ad_yield_streams] = [35.42, 0.270, 0.237, 0.087, 0.372]
         # Reformer
-        self.rf_yield_coef = {
-            7: {'yield': 158.7},
-            14: {'yield': 0.928}
-        }
+        self.rf_yield_streams = [7, 14]
+        self.rf_yield_coef = np.zeros(n_streams)
+        self.rf_yield_coef[self.rf_yield_streams] = [158.7, 0.928]
         # Catalytic Cracker for SRDS Feed
-        self.cc_srds_yield_coef = {
-            15: {'yield': 336.9},
-            16: {'yield': 0.619},
-            17: {'yield': 0.189}
-        }
+        self.cc_yield_streams = [15, 16, 17]
+        self.cc_srds_yield_coef = np.zeros(n_streams)
+        self.cc_srds_yield_coef[self.cc_yield_streams] = [336.9, 0.619, 0.189]
         # Catalytic Cracker for SRFO Feed
-        self.cc_srfo_yield_coef = {
-            15: {'yield': 386.4},
-            16: {'yield': 0.688},
-            17: {'yield': 0.2197}
-        }
+        self.cc_srfo_yield_coef = np.zeros(n_streams)
+        self.cc_srfo_yield_coef[self.cc_yield_streams] = [386.4, 0.688, 0.2197]
 
-        # Feed Properties for Blending
+        # Feed Properties for Blending, indexed by stream id
         # Octane Ratings
-        self.octane_rating = {
-            18: {'octane': 78.5},
-            19: {'octane': 78.5},
-            20: {'octane': 104},
-            21: {'octane': 104},
-            22: {'octane': 65},
-            23: {'octane': 65},
-            24: {'octane': 65},
-            25: {'octane': 93.7},
-            26: {'octane': 93.7}
-        }
+        self.octane_rating = np.zeros(n_streams)
+        self.octane_rating[[18, 19]] = 78.5
+        self.octane_rating[[20, 21]] = 104
+        self.octane_rating[[22, 23, 24]] = 65
+        self.octane_rating[[25, 26]] = 93.7
         # Vapour Pressures
-        self.vapour_pres = {
-            18: {'vpress': 18.4},
-            19: {'vpress': 18.4},
-            20: {'vpress': 2.57},
-            21: {'vpress': 2.57},
-            22: {'vpress': 6.54},
-            23: {'vpress': 6.54},
-            24: {'vpress': 6.54},
-            25: {'vpress': 6.9},
-            26: {'vpress': 6.9}
-        }
+        self.vapour_pres = np.zeros(n_streams)
+        self.vapour_pres[[18, 19]] = 18.4
+        self.vapour_pres[[20, 21]] = 2.57
+        self.vapour_pres[[22, 23, 24]] = 6.54
+        self.vapour_pres[[25, 26]] = 6.9
         # Densities
-        self.density_spec = {
-            24: {'density': 272},
-            27: {'density': 294.4},
-            28: {'density': 294.4},
-            29: {'density': 292},
-            30: {'density': 292},
-            31: {'density': 295},
-            32: {'density': 295}
-        }
+        self.density_spec = np.zeros(n_streams)
+        self.density_spec[24] = 272
+        self.density_spec[[27, 28]] = 294.4
+        self.density_spec[[29, 30]] = 292
+        self.density_spec[[31, 32]] = 295
         # Sulfur Concentrations
-        self.sulfur_spec = {
-            24: {'sulfur': 0.283},
-            27: {'sulfur': 0.353},
-            28: {'sulfur': 0.353},
-            29: {'sulfur': 0.526},
-            30: {'sulfur': 0.526},
-            31: {'sulfur': 0.980},
-            32: {'sulfur': 0.980}
-        }
+        self.sulfur_spec = np.zeros(n_streams)
+        self.sulfur_spec[24] = 0.283
+        self.sulfur_spec[[27, 28]] = 0.353
+        self.sulfur_spec[[29, 30]] = 0.526
+        self.sulfur_spec[[31, 32]] = 0.980
 
-    def build_model(self):
+    def build_model(self, verbose=False):
         """
         Build the optimization model with constraints and objectives.
-        Returns the Pyomo model object for solving.
+        Returns the Pyomo model object for solving. Set verbose to print the model.
         """
 
         # instantiate a concrete Pyomo model
@@ -121,7 +99,7 @@ class RefineryOptimizationConcrete:
         model.x = pyomo.Var(model.varidx, domain=pyomo.NonNegativeReals)
 
         # objective function (profit = products - operating cost - crude cost)
-        model.cost = pyomo.Objective(expr = sum(model.x[c] * self.costs[c]['cost'] for c in self.costs), sense=pyomo.maximize)
+        model.cost = pyomo.Objective(expr = linear_sum(model, self.cost_streams, self.costs[self.cost_streams]), sense=pyomo.maximize)
 
         # used if fixing variables to a VALUE is desired
         # model.x[1].value = 100000
@@ -139,16 +117,16 @@ class RefineryOptimizationConcrete:
 
         # volumetric yield equations
         model.ad_yield = pyomo.ConstraintList()
-        for y in self.ad_yield_coef:
-            model.ad_yield.add(expr = model.x[y] == model.x[1] * self.ad_yield_coef[y]['yield'])
+        for y in self.ad_yield_streams:
+            model.ad_yield.add(expr = model.x[y] == model.x[1] * self.ad_yield_coef[y])
 
         model.rf_yield = pyomo.ConstraintList()
-        for y in self.rf_yield_coef:
-            model.rf_yield.add(expr = model.x[y] == model.x[8] * self.rf_yield_coef[y]['yield'])
+        for y in self.rf_yield_streams:
+            model.rf_yield.add(expr = model.x[y] == model.x[8] * self.rf_yield_coef[y])
 
         model.cc_yield = pyomo.ConstraintList()
-        for y in self.cc_srds_yield_coef:
-            model.cc_yield.add(expr = model.x[y] == model.x[10] * self.cc_srds_yield_coef[y]['yield'] + model.x[12] * self.cc_srfo_yield_coef[y]['yield'])
+        for y in self.cc_yield_streams:
+            model.cc_yield.add(expr = model.x[y] == model.x[10] * self.cc_srds_yield_coef[y] + model.x[12] * self.cc_srfo_yield_coef[y])
 
         # demand constraints
         model.pg_demand = pyomo.Constraint(expr = model.x[33] >= 10000)
@@ -157,41 +135,44 @@ class RefineryOptimizationConcrete:
         model.fo_demand = pyomo.Constraint(expr = model.x[36] >= 10000)
 
         # blend tank balances
-        model.pg_blend = pyomo.Constraint(expr = model.x[33] == model.x[18] + model.x[20] + model.x[22] + model.x[25])
-        model.rg_blend = pyomo.Constraint(expr = model.x[34] == model.x[19] + model.x[21] + model.x[23] + model.x[26])
-        model.df_blend = pyomo.Constraint(expr = model.x[35] == model.x[24] + model.x[27] + model.x[29] + model.x[31])
-        model.fo_blend = pyomo.Constraint(expr = model.x[36] == model.x[28] + model.x[30] + model.x[32])
+        model.pg_blend = pyomo.Constraint(expr = linear_sum(model, [33, 18, 20, 22, 25], [1, -1, -1, -1, -1]) == 0)
+        model.rg_blend = pyomo.Constraint(expr = linear_sum(model, [34, 19, 21, 23, 26], [1, -1, -1, -1, -1]) == 0)
+        model.df_blend = pyomo.Constraint(expr = linear_sum(model, [35, 24, 27, 29, 31], [1, -1, -1, -1, -1]) == 0)
+        model.fo_blend = pyomo.Constraint(expr = linear_sum(model, [36, 28, 30, 32], [1, -1, -1, -1]) == 0)
 
         # quality constraints
         # premium gasoline
-        model.pg_octane = pyomo.Constraint(expr = sum(model.x[i] * self.octane_rating[i]['octane'] for i in [18, 20, 22, 25]) - 93 * model.x[33] >= 0)
-        model.pg_vpress = pyomo.Constraint(expr = sum(model.x[i] * self.vapour_pres[i]['vpress'] for i in [18, 20, 22, 25]) - 12.7 * model.x[33] <= 0)
+        model.pg_octane = pyomo.Constraint(expr = linear_sum(model, [18, 20, 22, 25] + [33], self.octane_rating[[18, 20, 22, 25]].tolist() + [-93]) >= 0)
+        model.pg_vpress = pyomo.Constraint(expr = linear_sum(model, [18, 20, 22, 25] + [33], self.vapour_pres[[18, 20, 22, 25]].tolist() + [-12.7]) <= 0)
 
         # regular gasoline
-        model.rg_octane = pyomo.Constraint(expr = sum(model.x[i] * self.octane_rating[i]['octane'] for i in [19, 21, 23, 26]) - 83 * model.x[34] >= 0)
-        model.rg_vpress = pyomo.Constraint(expr = sum(model.x[i] * self.vapour_pres[i]['vpress'] for i in [19, 21, 23, 26]) - 12.7 * model.x[34] <= 0)
+        model.rg_octane = pyomo.Constraint(expr = linear_sum(model, [19, 21, 23, 26] + [34], self.octane_rating[[19, 21, 23, 26]].tolist() + [-83]) >= 0)
+        model.rg_vpress = pyomo.Constraint(expr = linear_sum(model, [19, 21, 23, 26] + [34], self.vapour_pres[[19, 21, 23, 26]].tolist() + [-12.7]) <= 0)
 
         # diesel fuel
-        model.df_density = pyomo.Constraint(expr = sum(model.x[i] * self.density_spec[i]['density'] for i in [24, 27, 29, 31]) - 306 * model.x[35] <= 0)
-        model.df_sulfur = pyomo.Constraint(expr = sum(model.x[i] * self.sulfur_spec[i]['sulfur'] for i in [24, 27, 29, 31]) - 0.50 * model.x[35] <= 0)
+        model.df_density = pyomo.Constraint(expr = linear_sum(model, [24, 27, 29, 31] + [35], self.density_spec[[24, 27, 29, 31]].tolist() + [-306]) <= 0)
+        model.df_sulfur = pyomo.Constraint(expr = linear_sum(model, [24, 27, 29, 31] + [35], self.sulfur_spec[[24, 27, 29, 31]].tolist() + [-0.50]) <= 0)
 
         # fuel oil
-        model.fo_density = pyomo.Constraint(expr = sum(model.x[i] * self.density_spec[i]['density'] for i in [28, 30, 32]) - 352 * model.x[36] <= 0)
-        model.fo_sulfur = pyomo.Constraint(expr = sum(model.x[i] * self.sulfur_spec[i]['sulfur'] for i in [28, 30, 32]) - 3.0 * model.x[36] <= 0)
+        model.fo_density = pyomo.Constraint(expr = linear_sum(model, [28, 30, 32] + [36], self.density_spec[[28, 30, 32]].tolist() + [-352]) <= 0)
+        model.fo_sulfur = pyomo.Constraint(expr = linear_sum(model, [28, 30, 32] + [36], self.sulfur_spec[[28, 30, 32]].tolist() + [-3.0]) <= 0)
 
         # split point balances
         model.splitbalances = pyomo.ConstraintList()
         for s in self.split_list:
-            model.splitbalances.add(model.x[s] == sum(model.x[i] for i in self.split_list[s]))
+            model.splitbalances.add(linear_sum(model, [s] + self.split_list[s], [1] + [-1] * len(self.split_list[s])) == 0)
 
-        model.pprint()
+        if verbose:
+            model.pprint()
         return model
 
     def execute_optimization(self):
         """Builds the Pyomo Model then solves the optimization problem. Returns the solved model object."""
         opt_model = self.build_model()
-        solver = pyomo.SolverFactory('glpk')
-        solver.solve(opt_model, tee=True)
+        if type(self)._solver is None:
+            type(self)._solver = pyomo.SolverFactory('appsi_highs')
+            self._solver.options.update({'presolve': 'on'})
+        self._solver.solve(opt_model, tee=False)
 
         return opt_model
 
@@ -201,23 +182,23 @@ class RefineryOptimizationConcrete:
             print(opt_model.x[c])
             print(opt_model.x[c]())
 
-        print('Objective (Cost): ', sum(opt_model.x[c]() * self.costs[c]['cost'] for c in self.costs))
+        print('Objective (Cost): ', sum(opt_model.x[c]() * self.costs[c] for c in self.cost_streams))
 
         print('PG Production: ', opt_model.x[33]())
-        print('PG Octane: ', sum(opt_model.x[i]() * self.octane_rating[i]['octane'] for i in [18, 20, 22, 25]) / opt_model.x[33]())
-        print('PG Vapour Pressure: ', sum(opt_model.x[i]() * self.vapour_pres[i]['vpress'] for i in [18, 20, 22, 25]) / opt_model.x[33]())
+        print('PG Octane: ', sum(opt_model.x[i]() * self.octane_rating[i] for i in [18, 20, 22, 25]) / opt_model.x[33]())
+        print('PG Vapour Pressure: ', sum(opt_model.x[i]() * self.vapour_pres[i] for i in [18, 20, 22, 25]) / opt_model.x[33]())
 
         print('RG Production: ', opt_model.x[34]())
-        print('RG Octane: ', sum(opt_model.x[i]() * self.octane_rating[i]['octane'] for i in [19, 21, 23, 26]) / opt_model.x[34]())
-        print('RG Octane: ', sum(opt_model.x[i]() * self.vapour_pres[i]['vpress'] for i in [19, 21, 23, 26]) / opt_model.x[34]())
+        print('RG Octane: ', sum(opt_model.x[i]() * self.octane_rating[i] for i in [19, 21, 23, 26]) / opt_model.x[34]())
+        print('RG Octane: ', sum(opt_model.x[i]() * self.vapour_pres[i] for i in [19, 21, 23, 26]) / opt_model.x[34]())
 
         print('DF Production: ', opt_model.x[35]())
-        print('DF Density: ', sum(opt_model.x[i]() * self.density_spec[i]['density'] for i in [24, 27, 29, 31]) / opt_model.x[35]())
-        print('DF Sulfur: ', sum(opt_model.x[i]() * self.sulfur_spec[i]['sulfur'] for i in [24, 27, 29, 31]) / opt_model.x[35]())
+        print('DF Density: ', sum(opt_model.x[i]() * self.density_spec[i] for i in [24, 27, 29, 31]) / opt_model.x[35]())
+        print('DF Sulfur: ', sum(opt_model.x[i]() * self.sulfur_spec[i] for i in [24, 27, 29, 31]) / opt_model.x[35]())
 
         print('FO Production: ', opt_model.x[36]())
-        print('FO Density: ', sum(opt_model.x[i]() * self.density_spec[i]['density'] for i in [28, 30, 32]) / opt_model.x[36]())
-        print('FO Sulfur: ', sum(opt_model.x[i]() * self.sulfur_spec[i]['sulfur'] for i in [28, 30, 32]) / opt_model.x[36]())
+        print('FO Density: ', sum(opt_model.x[i]() * self.density_spec[i] for i in [28, 30, 32]) / opt_model.x[36]())
+        print('FO Sulfur: ', sum(opt_model.x[i]() * self.sulfur_spec[i] for i in [28, 30, 32]) / opt_model.x[36]())
 
         opt_model.display()
 
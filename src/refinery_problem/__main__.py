@@ -10,8 +10,8 @@ def main():
     # solve optimization problem
     optimization_result = helpers.execute_optimization(refinery_problem)
 
-    # print results
-    helpers.print_output(optimization_result)
+    # print results, including the flow rates
+    helpers.print_output(optimization_result, verbose=True)
 
 
 if __name__ == "__main__":
@@ -1,163 +1,298 @@
+import os
+import sys
+import functools
 import pyomo.environ as pyomo
-import pandas as pd
-import matplotlib.pyplot as plt
+from pyomo.opt import TerminationCondition
+import numpy as np
+from src.refinery_problem import model
 
+# x-axis of the tank inventory charts (timeperiods 1 to 5)
+CHART_TIMEPERIODS = np.arange(1, 6)
 
-def execute_optimization(opt_model):
+
+def execute_optimization(opt_model, verbose=False, log_path=None):
     """
     Helper function to receive the instantiated Pyomo Model then solve the optimization problem. Returns the solved model object.
+    Set verbose to print the model instance and stream the solver log, and log_path to write the solver log to a file.
+    The solver is persistent, so a re-solve of the same model (e.g. after changing opt_model.alpha) starts from the basis of the previous solve.
     """
     # Display instance information
-    opt_model.pprint()
+    if verbose:
+        opt_model.pprint()
 
-    solver = pyomo.SolverFactory('glpk')
-    solver.solve(opt_model, tee=True)
+    solver = get_solver()
+    # HiGHS writes its log even without tee (pyomo captures it), so only produce it when it is streamed or saved
+    # (the options are set on every solve, as HiGHS keeps them between solves of the cached solver)
+    log_options = {'output_flag': verbose or log_path is not None, 'log_file': log_path or ''}
+    solver.solve(opt_model, tee=verbose, options=log_options)
 
     return opt_model
 
 
-def print_output(opt_model):
+def print_output(opt_model, verbose=False):
+    """
+    Helper function to print the total profit and production of each product and their properties.
+    Set verbose to first print the flow rates (the full model display).
+    """
+    if verbose:
+        opt_model.display()
+    # pull the solved values and the parameters out as plain dicts once, then index floats below
+    x_vals, m_vals = opt_model.x.extract_values(), opt_model.m.extract_values()
+    holding_cost = opt_model.tank_holding_cost.extract_values()
+    timeperiods = list(opt_model.timeperiods)
+    objective_excl_tanks = sum(x_vals[c + (t,)] * cost for c, cost in opt_model.costs.extract_values().items() for t in timeperiods)
+    tank_holding_costs = sum(holding_cost[tank] * m_vals[tank, t] for tank in opt_model.tank_set for t in timeperiods)
+
+    # blend quality ratios for every timeperiod at once: (component flows @ component ratings) / product flow
+    # the flows of each blend are read once and shared by both of its properties
+    blends = [
+        ('PG', opt_model.pg_set, ('pg_prod', 'pg_tk', 'pg_out'), (('Octane', opt_model.pg_octane_rating), ('Vapour Pressure', opt_model.pg_vpress_rating))),
+        ('RG', opt_model.rg_set, ('rg_prod', 'rg_tk', 'rg_out'), (('Octane', opt_model.rg_octane_rating), ('Vapour Pressure', opt_model.rg_vpress_rating))),
+        ('DF', opt_model.df_set, ('df_prod', 'df_tk', 'df_out'), (('Density', opt_model.df_density_spec), ('Sulfur', opt_model.df_sulfur_spec))),
+        ('FO', opt_model.fo_set, ('fo_prod', 'fo_tk', 'fo_out'), (('Density', opt_model.fo_density_spec), ('Sulfur', opt_model.fo_sulfur_spec)))
+    ]
+    quality_ratios = []
+    for blend, blend_set, product, properties in blends:
+        flows = np.array([[x_vals[stream + (t,)] for stream in blend_set] for t in timeperiods], dtype=np.float64)
+        product_flows = np.fromiter((x_vals[product + (t,)] for t in timeperiods), dtype=np.float64, count=len(timeperiods))
+        for name, rating in properties:
+            rating_vals = rating.extract_values()
+            ratings = np.fromiter((rating_vals[stream] for stream in blend_set), dtype=np.float64, count=len(blend_set))
+            quality_ratios.append((f'{blend} {name}:', flows @ ratings / product_flows))
+
+    # collect the report lines and write them in one go
+    lines = [f'Objective Excluding Tank Holding Costs: {objective_excl_tanks}', f'Tank Holding Costs: {tank_holding_costs}']
+    for i, t in enumerate(timeperiods):
+        lines.append(f'~~~~~~~~~~~~~ Timeperiod : {t}  ~~~~~~~~~~~~~')
+        lines.extend(f'{label} {ratios[i]}' for label, ratios in quality_ratios)
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+
+@functools.lru_cache(maxsize=None)
+def get_solver(solver_name='appsi_highs'):
+    """
+    Helper function to create a solver, by default HiGHS (APPSI persistent interface). Each solver is created once per process and reused for every solve.
+    Since the scenarios are solved on the same base model, HiGHS keeps the model loaded and only updates the changed alphas and fixed flows.
+    """
+    return pyomo.SolverFactory(solver_name)
+
+
+@functools.lru_cache(maxsize=None)
+def get_base_model():
+    """
+    Helper function to build the refinery model once per process.
+    Scenario solves reuse this model and revert their tank settings and alphas afterwards, so it is never rebuilt.
+    """
+    return model.RefineryModel().build_model()
+
+
+def solve_scenario(fix_tanks, alpha_list):
+    """
+    Helper function to turn off the case study tanks with fix_tanks and set the alphas of one shutdown scenario on the base model, then solve it.
+    The model is restored afterwards. Returns the results series from store_results_pd.
+    """
+    opt_model = get_base_model()
+
+    # record the fixed state of the flows so that the case study tank settings can be reverted
+    fixed_state = [(var, var.fixed, var.value) for var in opt_model.x.values()]
+
+    # the model is restored even if a solve fails, since every later scenario of this process reuses it
+    try:
+        fix_tanks(opt_model)
+
+        # SET Alphas for shutdown scenario
+        for sd_pair in alpha_list:
+            opt_model.alpha[sd_pair[0], sd_pair[1]] = 1
+
+        # Solve optimization problem
+        # (only load the solution when one was found - infeasible scenarios are stored as failed)
+        solver = get_solver()
+        solver_information = solver.solve(opt_model, tee=False, load_solutions=False, options={'output_flag': False})
+        if solver_information.solver.termination_condition == TerminationCondition.optimal:
+            opt_model.solutions.load_from(solver_information)
+
+        results_series = store_results_pd(opt_model, solver_information)
+    finally:
+        # RESET Alphas and tank settings
+        for sd_pair in alpha_list:
+            opt_model.alpha[sd_pair[0], sd_pair[1]] = 0
+        # (only the flows that are fixed in the base model get their value back - the others keep their last value, as the
+        # persistent solver still reads the values of the flows it had fixed when it updates for the next solve)
+        for var, fixed, value in fixed_state:
+            var.fixed = fixed
+            if fixed:
+                var.value = value
+
+    return results_series
+
+
+def execute_scenarios(fix_tanks, shutdown_conditions):
     """
-    Helper function to print the flow rates, then the total profit and production of each product and their properties..
+    Helper function to solve the shutdown scenarios of a case study one after another in this process
+    (the case studies themselves are solved in parallel worker processes by src/case_studies).
+    Every scenario is solved on the base model of the process that runs it (get_base_model), and solve_scenario restores the alphas
+    and the fixed flows afterwards, so the next scenario starts from the base model again. Returns the results dataframe (one column per scenario).
     """
-    opt_model.display()
-    print('Objective Excluding Tank Holding Costs:', sum(pyomo.value(opt_model.x[c, t] * opt_model.costs[c]) for c in opt_model.costs for t in opt_model.timeperiods))
-    print('Tank Holding Costs:', sum(opt_model.tank_holding_cost[tank] * pyomo.value(opt_model.m[tank, t]) for tank in opt_model.tank_set for t in opt_model.timeperiods))
+    import pandas as pd
+
+    # solve each scenario and collect the results series by scenario, then create the dataframe in a single call
+    columns = {}
+    for case, alpha_list in shutdown_conditions.items():
+        columns[case] = solve_scenario(fix_tanks, alpha_list)
 
-    for t in opt_model.timeperiods:
-        print('~~~~~~~~~~~~~ Timeperiod :', t, ' ~~~~~~~~~~~~~')
-        print('PG Octane:', sum(pyomo.value(opt_model.x[mat, uout, uin, t]) * pyomo.value(opt_model.pg_octane_rating[mat, uout, uin]) for (mat, uout, uin) in opt_model.pg_set) / pyomo.value(opt_model.x['pg_prod', 'pg_tk', 'pg_out', t]))
-        print('PG Vapour Pressure:', sum(pyomo.value(opt_model.x[mat, uout, uin, t]) * pyomo.value(opt_model.pg_vpress_rating[mat, uout, uin]) for (mat, uout, uin) in opt_model.pg_set) / pyomo.value(opt_model.x['pg_prod', 'pg_tk', 'pg_out', t]))
-        print('RG Octane:', sum(pyomo.value(opt_model.x[mat, uout, uin, t]) * pyomo.value(opt_model.rg_octane_rating[mat, uout, uin]) for (mat, uout, uin) in opt_model.rg_set) / pyomo.value(opt_model.x['rg_prod', 'rg_tk', 'rg_out', t]))
-        print('RG Vapour Pressure:', sum(pyomo.value(opt_model.x[mat, uout, uin, t]) * pyomo.value(opt_model.rg_vpress_rating[mat, uout, uin]) for (mat, uout, uin) in opt_model.rg_set) / pyomo.value(opt_model.x['rg_prod', 'rg_tk', 'rg_out', t]))
-        print('DF Density:', sum(pyomo.value(opt_model.x[mat, uout, uin, t]) * pyomo.value(opt_model.df_density_spec[mat, uout, uin]) for (mat, uout, uin) in opt_model.df_set) / pyomo.value(opt_model.x['df_prod', 'df_tk', 'df_out', t]))
-        print('DF Sulfur:', sum(pyomo.value(opt_model.x[mat, uout, uin, t]) * pyomo.value(opt_model.df_sulfur_spec[mat, uout, uin]) for (mat, uout, uin) in opt_model.df_set) / pyomo.value(opt_model.x['df_prod', 'df_tk', 'df_out', t]))
-        print('FO Density:', sum(pyomo.value(opt_model.x[mat, uout, uin, t]) * pyomo.value(opt_model.fo_density_spec[mat, uout, uin]) for (mat, uout, uin) in opt_model.fo_set) / pyomo.value(opt_model.x['fo_prod', 'fo_tk', 'fo_out', t]))
-        print('FO Sulfur:', sum(pyomo.value(opt_model.x[mat, uout, uin, t]) * pyomo.value(opt_model.fo_sulfur_spec[mat, uout, uin]) for (mat, uout, uin) in opt_model.fo_set) / pyomo.value(opt_model.x['fo_prod', 'fo_tk', 'fo_out', t]))
+    output_results_df = pd.DataFrame(columns)
+    return output_results_df
 
 
 def store_results_pd(opt_model, solver_information):
     """
     Helper function to store the optimization results in a dataframe.
     """
+    import pandas as pd
+
     store_index = []
     store_values = []
 
-    # Store flow rates and tank volumes
-    for v in opt_model.component_data_objects(pyomo.Var):
-        store_index.append(v.name)
-        if solver_information.solver.termination_condition == 'optimal':
-            store_values.append(pyomo.value(v))
-        else:
-            store_values.append(0)
-
-    # Store Alphas
-    for p in opt_model.component_data_objects(pyomo.Param):
-        if hasattr(p, 'name'):
-            if 'alpha' in p.name:
+    # check the termination condition once - the variable values are only meaningful for an optimal solve
+    optimal = solver_information.solver.termination_condition == TerminationCondition.optimal
+
+    # Store flow rates and tank volumes, and the alphas, in a single pass over the model components
+    # (the alpha check is made once per Param component rather than on every Param entry)
+    for component in opt_model.component_objects(ctype=(pyomo.Var, pyomo.Param)):
+        if component.ctype is pyomo.Var:
+            for v in component.values():
+                store_index.append(v.name)
+                if optimal:
+                    store_values.append(pyomo.value(v))
+                else:
+                    store_values.append(0)
+        elif component.local_name.startswith('alpha'):
+            for p in component.values():
                 store_index.append(p.name)
                 store_values.append(pyomo.value(p))
 
-    # Sort by alphabetical
-    paired_list = zip(store_index, store_values)
-    sorted_list = sorted(paired_list)
-    tuples_list = zip(*sorted_list)
-    store_index, store_values = [list(i) for i in tuples_list]
+    # Sort by alphabetical (the names are unique, so sorting the names alone gives the same order)
+    index_arr = np.asarray(store_index)
+    order = np.argsort(index_arr, kind='stable')
+    store_index = index_arr[order].tolist()
+    store_values = [store_values[i] for i in order]
 
     # Add objective value to top and termination conditions
-    if solver_information.solver.termination_condition == 'optimal':
-        for obj in opt_model.component_data_objects(pyomo.Objective):
-            store_index.insert(0, 'Objective')
-            store_values.insert(0, pyomo.value(obj))
-        store_index.insert(0, 'Termination Condition')
-        store_values.insert(0, solver_information.solver.termination_condition)
-        store_index.insert(0, 'Solver Status')
-        store_values.insert(0, solver_information.solver.status)
+    header_index = ['Solver Status', 'Termination Condition', 'Objective']
+    if optimal:
+        objective = next(opt_model.component_data_objects(pyomo.Objective))
+        header_values = [solver_information.solver.status, solver_information.solver.termination_condition, pyomo.value(objective)]
     else:
-        store_index.insert(0, 'Objective')
-        store_values.insert(0, 0)
-        store_index.insert(0, 'Termination Condition')
-        store_values.insert(0, 'infeasible')
-        store_index.insert(0, 'Solver Status')
-        store_values.insert(0, 'failed')
-
-    output_df = pd.Series(data=store_values, index=store_index)
+        header_values = ['failed', 'infeasible', 0]
+
+    output_df = pd.Series(data=header_values + store_values, index=header_index + store_index)
     return output_df
 
 
-def plot_charts(results_df, case_number):
+@functools.lru_cache(maxsize=None)
+def _pyplot():
     """
-    Helper function to create a chart of the tank inventories.
+    Helper function to import pyplot the first time a chart is made, so matplotlib is not loaded just to solve the model.
+    The charts are only saved to PNG files, so the Agg backend is selected before the import, unless pyplot is already in use
+    or a backend is set with MPLBACKEND.
     """
+    import matplotlib
+    if 'matplotlib.pyplot' not in sys.modules and 'MPLBACKEND' not in os.environ:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    return plt
+
 
-    # create figure and subplots
+def create_figure():
+    """
+    Helper function to create the figure and the grid of subplots (tanks x scenarios) for the tank inventory charts.
+    """
+    plt = _pyplot()
     fig = plt.figure(figsize=(16, 6), layout='constrained')
     gs = fig.add_gridspec(4, 10, hspace=0.05, wspace=0.1)
     axs = gs.subplots(sharex=True, sharey=False)
 
+    return fig, axs
+
+
+def plot_charts(results_df, case_number, fig=None, axs=None):
+    """
+    Helper function to create a chart of the tank inventories.
+    The figure and subplots from create_figure can be passed in to reuse them across case studies - once they hold the charts,
+    only the plotted tank inventories and the titles are updated.
+    """
+    plt = _pyplot()
+
+    # create figure and subplots, or reuse the already plotted lines, axis limits, ticks and labels of the ones passed in
+    if fig is None:
+        fig, axs = create_figure()
+    reuse = len(axs[0, 0].lines) > 0
+
     # for each tank, create the chart for each scenario
+    # the tank inventories m are sliced out of the results_df once, as a (tank, timeperiod, scenario) array
     tank_list = ['rfg_tk', 'ccfo_tk', 'ccg_tk', 'srn_tk']
-    for tank_idx, tank_name in enumerate(tank_list):
+    tank_rows = [f'm[{tank},{t}]' for tank in tank_list for t in CHART_TIMEPERIODS]
+    inventories = results_df.loc[tank_rows].to_numpy(dtype=np.float64).reshape(len(tank_list), len(CHART_TIMEPERIODS), -1)
+    for tank_idx in range(0, len(tank_list), 1):
         for scenario_idx in range(0, results_df.shape[1], 1):
-            scenario_col_name = results_df.columns[scenario_idx]
-            # helper function create_chart
-            create_chart(axs[tank_idx, scenario_idx], results_df, tank_name, scenario_col_name, {'marker': 'o'})
+            if reuse:
+                axs[tank_idx, scenario_idx].lines[0].set_ydata(inventories[tank_idx, :, scenario_idx])
+            else:
+                # helper function create_chart
+                create_chart(axs[tank_idx, scenario_idx], inventories[tank_idx, :, scenario_idx], {'marker': 'o'})
 
     # give each column and row a label/title
-    rows = ['{} Tank'.format(col) for col in ['RFG', 'CCFO', 'CCG', 'SRN']]
-    cols = ['Scenario {0}\n({1})'.format(row, results_df.loc['Termination Condition', row]) for row in range(1, results_df.shape[1]+1, 1)]
+    rows = [f'{col} Tank' for col in ['RFG', 'CCFO', 'CCG', 'SRN']]
+    cols = [f"Scenario {row}\n({results_df.loc['Termination Condition', row]})" for row in range(1, results_df.shape[1]+1, 1)]
 
     # column titles
     for ax, col in zip(axs[0], cols):
         ax.set_title(col)
 
-    # Order: 'RFG', 'CCFO', 'CCG', 'SRN'
-    tank_max = {0: 19000,
-                1: 19000,
-                2: 25000,
-                3: 19000}
-    row_ticks = {0: [0, 6000, 12000, 18000],
-                 1: [0, 6000, 12000, 18000],
-                 2: [0, 8000, 16000, 24000],
-                 3: [0, 6000, 12000, 18000]}
-
-    # set y limits and ticks for each row (tank)
-    for i, j in enumerate(axs):
-        for k in j:
-            k.set_ylim(bottom=0, top=tank_max[i])
-            k.set_yticks(row_ticks[i])
-
-    # row labels
-    for ax, row in zip(axs[:, 0], rows):
-        ax.set_ylabel(row, rotation=0, size='medium', loc='center', labelpad=30)
-
-    # set axis limits and ticks and bottom x labels
-    # plt.setp(axs, ylim=[0, 18000], yticks=[0, 5000,  10000, 15000], xlim=[1, 5], xticks=[1, 2, 3, 4, 5], xlabel='Period (d)')
-    plt.setp(axs, xlim=[1, 5], xticks=[1, 2, 3, 4, 5], xlabel='Period (d)')
-
-    # only show the outer labels
-    for ax in axs.flat:
-        ax.label_outer()
+    # the axis setup only needs to be done once per figure
+    if not reuse:
+        # Order: 'RFG', 'CCFO', 'CCG', 'SRN'
+        tank_max = {0: 19000,
+                    1: 19000,
+                    2: 25000,
+                    3: 19000}
+        row_ticks = {0: [0, 6000, 12000, 18000],
+                     1: [0, 6000, 12000, 18000],
+                     2: [0, 8000, 16000, 24000],
+                     3: [0, 6000, 12000, 18000]}
+
+        # set y limits and ticks for each row (tank)
+        for i, j in enumerate(axs):
+            for k in j:
+                k.set_ylim(bottom=0, top=tank_max[i])
+                k.set_yticks(row_ticks[i])
+
+        # row labels
+        for ax, row in zip(axs[:, 0], rows):
+            ax.set_ylabel(row, rotation=0, size='medium', loc='center', labelpad=30)
+
+        # set axis limits and ticks and bottom x labels
+        # plt.setp(axs, ylim=[0, 18000], yticks=[0, 5000,  10000, 15000], xlim=[1, 5], xticks=[1, 2, 3, 4, 5], xlabel='Period (d)')
+        plt.setp(axs, xlim=[1, 5], xticks=[1, 2, 3, 4, 5], xlabel='Period (d)')
+
+        # only show the outer labels
+        for ax in axs.flat:
+            ax.label_outer()
 
     # plot title and size
-    fig.suptitle('Tank Inventories (m3) for Case Study {}'.format(case_number))
+    fig.suptitle(f'Tank Inventories (m3) for Case Study {case_number}')
     fig.get_layout_engine().set(rect=(0, 0, 1, 1))
 
     # save figure
-    fig.savefig('./results/case_study_0{}.png'.format(case_number))
+    fig.savefig(f'./results/case_study_0{case_number}.png')
     # fig.show()
 
 
-def create_chart(ax, results_df, tank, scenario, param_dict):
+def create_chart(ax, y, param_dict):
     """
-    A helper function to make the results graph.
+    A helper function to make the results graph. y are the tank inventories m of one tank and scenario per timeperiod.
     """
-    # create list of the tank inventories m from the results_df with a given tank and scenario
-    y = []
-    for t in range(1, 6, 1):
-        tank_str = 'm[' + tank + ',' + str(t) + ']'
-        y.append(results_df.loc[tank_str, scenario])
-
     # create the plot
-    plots_out = ax.plot(range(1, 6, 1), y, **param_dict)
+    plots_out = ax.plot(CHART_TIMEPERIODS, y, **param_dict)
     return plots_out
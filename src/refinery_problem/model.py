@@ -1,11 +1,178 @@
 import pyomo.environ as pyomo
+from pyomo.core.expr.numeric_expr import LinearExpression
 import numpy as np
-import itertools
+import functools
+import types
 
 
 class RefineryModel:
     """Class used to create an optimization object, set-up the problem, solve, and output."""
 
+    # data attributes set in __init__ (no per-instance __dict__, and a misspelled attribute raises instead of being created)
+    # the fixed problem data below is shared by all instances as read-only class constants
+    __slots__ = (
+        'timehorizon', 'timedelta', 'timeperiods', 'alpha_param', 'unitpairs', 'flowpairs', 'cost_streams', 'splitpoint_dict_mp', 'splitpoint_outlets', 'splitpoint_inlets',
+        'blend_streams', 'blend_quality', 'tank_area'
+    )
+
+    # create dictionary to map flow streams to originating and receiving units (tuples keep a fixed iteration order)
+    map_to_units = types.MappingProxyType({
+        'crude': (('crude_source', 'ad'),),
+        'srg': (('ad', 'srg_sp'), ('srg_sp', 'pg_tk'), ('srg_sp', 'rg_tk')),
+        'srn': (('ad', 'srn_sp'), ('srn_sp', 'rf'), ('srn_sp', 'pg_tk'), ('srn_sp', 'rg_tk'), ('srn_sp', 'df_tk'), ('srn_sp', 'srn_tk'), ('srn_tk', 'rf')),  # NEW
+        'srds': (('ad', 'srds_sp'), ('srds_sp', 'cc'), ('srds_sp', 'df_tk'), ('srds_sp', 'fo_tk')),
+        'srfo': (('ad', 'srfo_sp'), ('srfo_sp', 'cc'), ('srfo_sp', 'df_tk'), ('srfo_sp', 'fo_tk')),
+        'rfg': (('rf', 'rfg_sp'), ('rfg_sp', 'pg_tk'), ('rfg_sp', 'rg_tk'), ('rf', 'rfg_tk'), ('rfg_tk', 'rfg_sp')),  # NEW
+        'ccg': (('cc', 'ccg_sp'), ('ccg_sp', 'pg_tk'), ('ccg_sp', 'rg_tk'), ('cc', 'ccg_tk'), ('ccg_tk', 'ccg_sp')),  # NEW
+        'ccfo': (('cc', 'ccfo_sp'), ('ccfo_sp', 'df_tk'), ('ccfo_sp', 'fo_tk'), ('cc', 'ccfo_tk'), ('ccfo_tk', 'ccfo_sp')),  # NEW
+        'fg': (('ad', 'fg_sink'), ('rf', 'fg_sink'), ('cc', 'fg_sink')),
+        'pg_prod': (('pg_tk', 'pg_out'),),
+        'rg_prod': (('rg_tk', 'rg_out'),),
+        'df_prod': (('df_tk', 'df_out'),),
+        'fo_prod': (('fo_tk', 'fo_out'),)
+    })
+
+    # costs for designated streams (operating costs, material cost, product costs)
+    cost_data = types.MappingProxyType({
+        ('crude', 'crude_source', 'ad'): -33,
+        ('fg', 'ad', 'fg_sink'): 0.01965,
+        ('fg', 'rf', 'fg_sink'): 0.01965,
+        ('srn', 'srn_sp', 'rf'): -2.5,
+        ('srn', 'srn_tk', 'rf'): -2.5,  # NEW
+        ('srds', 'srds_sp', 'cc'): -2.2,
+        ('srfo', 'srfo_sp', 'cc'): -2.2,
+        ('fg', 'cc', 'fg_sink'): 0.01965,
+        ('pg_prod', 'pg_tk', 'pg_out'): 45.36,
+        ('rg_prod', 'rg_tk', 'rg_out'): 43.68,
+        ('df_prod', 'df_tk', 'df_out'): 40.32,
+        ('fo_prod', 'fo_tk', 'fo_out'): 13.14,
+        ('srn', 'srn_sp', 'srn_tk'): -0.5,  # NEW
+        ('rfg', 'rf', 'rfg_tk'): -0.5,  # NEW
+        ('ccg', 'cc', 'ccg_tk'): -0.5,  # NEW
+        ('ccfo', 'cc', 'ccfo_tk'): -0.5  # NEW
+    })
+
+    # dictionary of each split origin (key) and the respective split streams (values)
+    splitpoint_dict = types.MappingProxyType({
+        ('srg', 'ad', 'srg_sp'): (('srg', 'srg_sp', 'pg_tk'), ('srg', 'srg_sp', 'rg_tk')),
+        ('srn', 'ad', 'srn_sp'): (('srn', 'srn_sp', 'rf'), ('srn', 'srn_sp', 'pg_tk'), ('srn', 'srn_sp', 'rg_tk'), ('srn', 'srn_sp', 'df_tk'), ('srn', 'srn_sp', 'srn_tk')),
+        ('srds', 'ad', 'srds_sp'): (('srds', 'srds_sp', 'cc'), ('srds', 'srds_sp', 'df_tk'), ('srds', 'srds_sp', 'fo_tk')),
+        ('srfo', 'ad', 'srfo_sp'): (('srfo', 'srfo_sp', 'cc'), ('srfo', 'srfo_sp', 'df_tk'), ('srfo', 'srfo_sp', 'fo_tk')),
+        ('rfg', 'rf', 'rfg_sp'): (('rfg', 'rfg_sp', 'pg_tk'), ('rfg', 'rfg_sp', 'rg_tk')),
+        ('rfg', 'rfg_tk', 'rfg_sp'): (('rfg', 'rfg_sp', 'pg_tk'), ('rfg', 'rfg_sp', 'rg_tk')),  # NEW
+        ('ccg', 'cc', 'ccg_sp'): (('ccg', 'ccg_sp', 'pg_tk'), ('ccg', 'ccg_sp', 'rg_tk')),
+        ('ccg', 'ccg_tk', 'ccg_sp'): (('ccg', 'ccg_sp', 'pg_tk'), ('ccg', 'ccg_sp', 'rg_tk')),  # NEW
+        ('ccfo', 'cc', 'ccfo_sp'): (('ccfo', 'ccfo_sp', 'df_tk'), ('ccfo', 'ccfo_sp', 'fo_tk')),
+        ('ccfo', 'ccfo_tk', 'ccfo_sp'): (('ccfo', 'ccfo_sp', 'df_tk'), ('ccfo', 'ccfo_sp', 'fo_tk'))  # NEW
+    })
+
+    # product demand data
+    product_demand_data = types.MappingProxyType({
+        ('pg_prod', 'pg_tk', 'pg_out'): 10000,
+        ('rg_prod', 'rg_tk', 'rg_out'): 10000,
+        ('df_prod', 'df_tk', 'df_out'): 10000,
+        ('fo_prod', 'fo_tk', 'fo_out'): 10000
+    })
+
+    # yield coefficients for each unit operation
+    # Atmospheric Distillation
+    ad_yield_coef = types.MappingProxyType({
+        ('fg', 'ad', 'fg_sink'): 35.42,
+        ('srg', 'ad', 'srg_sp'): 0.270,
+        ('srn', 'ad', 'srn_sp'): 0.237,
+        ('srds', 'ad', 'srds_sp'): 0.087,
+        ('srfo', 'ad', 'srfo_sp'): 0.372
+    })
+
+    # Reformer
+    rf_yield_coef = types.MappingProxyType({
+        ('fg', 'rf', 'fg_sink'): 158.7,
+        ('rfg', 'rf', 'rfg_sp'): 0.928
+    })
+
+    # Catalytic Cracker for SRDS Feed
+    cc_srds_yield_coef = types.MappingProxyType({
+        ('fg', 'cc', 'fg_sink'): 336.9,
+        ('ccg', 'cc', 'ccg_sp'): 0.619,
+        ('ccfo', 'cc', 'ccfo_sp'): 0.189
+    })
+
+    # Catalytic Cracker for SRFO Feed
+    cc_srfo_yield_coef = types.MappingProxyType({
+        ('fg', 'cc', 'fg_sink'): 386.4,
+        ('ccg', 'cc', 'ccg_sp'): 0.688,
+        ('ccfo', 'cc', 'ccfo_sp'): 0.2197
+    })
+
+    # Feed Properties for Blending (per material - the same feed has the same properties in either blend tank)
+    # Octane Ratings and Vapour Pressures of the gasoline feeds
+    gasoline_octane = types.MappingProxyType({'srg': 78.5, 'rfg': 104, 'srn': 65, 'ccg': 93.7})
+    gasoline_vpress = types.MappingProxyType({'srg': 18.4, 'rfg': 2.57, 'srn': 6.54, 'ccg': 6.9})
+
+    # Densities and Sulfur Concentrations of the diesel/fuel oil feeds
+    fuel_density = types.MappingProxyType({'srn': 272, 'ccfo': 294.4, 'srds': 292, 'srfo': 295})
+    fuel_sulfur = types.MappingProxyType({'srn': 0.283, 'ccfo': 0.353, 'srds': 0.526, 'srfo': 0.980})
+
+    # Component materials and product stream of each blend tank
+    blend_materials = types.MappingProxyType({
+        'pg': ('srg', 'rfg', 'srn', 'ccg'),
+        'rg': ('srg', 'rfg', 'srn', 'ccg'),
+        'df': ('srn', 'ccfo', 'srds', 'srfo'),
+        'fo': ('ccfo', 'srds', 'srfo')
+    })
+    blend_products = types.MappingProxyType({
+        'pg': ('pg_prod', 'pg_tk', 'pg_out'),
+        'rg': ('rg_prod', 'rg_tk', 'rg_out'),
+        'df': ('df_prod', 'df_tk', 'df_out'),
+        'fo': ('fo_prod', 'fo_tk', 'fo_out')
+    })
+
+    # Product quality specifications (constraint name, blend, quality table column, limit, sense)
+    quality_specs = (
+        ('pg_octane', 'pg', 0, 93, '>='),
+        ('pg_vpress', 'pg', 1, 12.7, '<='),
+        ('rg_octane', 'rg', 0, 83, '>='),
+        ('rg_vpress', 'rg', 1, 12.7, '<='),
+        ('df_density', 'df', 0, 306, '<='),
+        ('df_sulfur', 'df', 1, 0.50, '<='),
+        ('fo_density', 'fo', 0, 352, '<='),
+        ('fo_sulfur', 'fo', 1, 3.0, '<=')
+    )
+
+    # Tank data
+    tank_height = types.MappingProxyType({
+        'srn_tk': 10,
+        'rfg_tk': 10,
+        'ccg_tk': 10,
+        'ccfo_tk': 10
+    })
+    tank_radius = types.MappingProxyType({
+        'srn_tk': 5,
+        'rfg_tk': 5,
+        'ccg_tk': 5,
+        'ccfo_tk': 5
+    })
+    bbl_to_m3 = 0.158  # 0.158m3/bbl
+    tank_list = ('srn_tk', 'rfg_tk', 'ccg_tk', 'ccfo_tk')
+    tank_in_dict = types.MappingProxyType({
+        'srn_tk': (('srn', 'srn_sp', 'srn_tk'),),
+        'rfg_tk': (('rfg', 'rf', 'rfg_tk'),),
+        'ccg_tk': (('ccg', 'cc', 'ccg_tk'),),
+        'ccfo_tk': (('ccfo', 'cc', 'ccfo_tk'),)
+    })
+    tank_out_dict = types.MappingProxyType({
+        'srn_tk': (('srn', 'srn_tk', 'rf'),),
+        'rfg_tk': (('rfg', 'rfg_tk', 'rfg_sp'),),
+        'ccg_tk': (('ccg', 'ccg_tk', 'ccg_sp'),),
+        'ccfo_tk': (('ccfo', 'ccfo_tk', 'ccfo_sp'),)
+    })
+    tank_holding_cost_data = types.MappingProxyType({
+        'srn_tk': 1.5,
+        'rfg_tk': 1.5,
+        'ccg_tk': 1.5,
+        'ccfo_tk': 1.5
+    })
+
     def __init__(self):
         """
         Initialization of sets and data for the multiperiod problem
@@ -13,12 +180,13 @@ class RefineryModel:
         A: self.map_to_units
         B: self.cost_data
         C: self.splitpoint_dict
-        D: Tank data in init
+        D: Tank data in the class constants
         E: Yield equations in self.build_model
         """
 
         self.timehorizon = 5
         self.timedelta = 1
+        self.timeperiods = tuple(range(1, self.timehorizon+1, 1))
 
         # shutdown parameter - 1 for shutdown, 0 elsewhere
         alpha_default = {
@@ -29,204 +197,44 @@ class RefineryModel:
 
         # assign the timeperiods to alpha
         self.alpha_param = {}
-        for t in range(1, self.timehorizon+1, 1):
+        for t in self.timeperiods:
             for i in alpha_default:
                 self.alpha_param[(i + (t,))] = 0
 
-        # create dictionary to map flow streams to originating and receiving units
-        self.map_to_units = {
-            'crude': {('crude_source', 'ad')},
-            'srg': {('ad', 'srg_sp'), ('srg_sp', 'pg_tk'), ('srg_sp', 'rg_tk')},
-            'srn': {('ad', 'srn_sp'), ('srn_sp', 'rf'), ('srn_sp', 'pg_tk'), ('srn_sp', 'rg_tk'), ('srn_sp', 'df_tk'), ('srn_sp', 'srn_tk'), ('srn_tk', 'rf')},  # NEW
-            'srds': {('ad', 'srds_sp'), ('srds_sp', 'cc'), ('srds_sp', 'df_tk'), ('srds_sp', 'fo_tk')},
-            'srfo': {('ad', 'srfo_sp'), ('srfo_sp', 'cc'), ('srfo_sp', 'df_tk'), ('srfo_sp', 'fo_tk')},
-            'rfg': {('rf', 'rfg_sp'), ('rfg_sp', 'pg_tk'), ('rfg_sp', 'rg_tk'), ('rf', 'rfg_tk'), ('rfg_tk', 'rfg_sp')},  # NEW
-            'ccg': {('cc', 'ccg_sp'), ('ccg_sp', 'pg_tk'), ('ccg_sp', 'rg_tk'), ('cc', 'ccg_tk'), ('ccg_tk', 'ccg_sp')},  # NEW
-            'ccfo': {('cc', 'ccfo_sp'), ('ccfo_sp', 'df_tk'), ('ccfo_sp', 'fo_tk'), ('cc', 'ccfo_tk'), ('ccfo_tk', 'ccfo_sp')},  # NEW
-            'fg': {('ad', 'fg_sink'), ('rf', 'fg_sink'), ('cc', 'fg_sink')},
-            'pg_prod': {('pg_tk', 'pg_out')},
-            'rg_prod': {('rg_tk', 'rg_out')},
-            'df_prod': {('df_tk', 'df_out')},
-            'fo_prod': {('fo_tk', 'fo_out')}
-        }
-
-        # costs for designated streams (operating costs, material cost, product costs)
-        self.cost_data = {
-            ('crude', 'crude_source', 'ad'): -33,
-            ('fg', 'ad', 'fg_sink'): 0.01965,
-            ('fg', 'rf', 'fg_sink'): 0.01965,
-            ('srn', 'srn_sp', 'rf'): -2.5,
-            ('srn', 'srn_tk', 'rf'): -2.5,  # NEW
-            ('srds', 'srds_sp', 'cc'): -2.2,
-            ('srfo', 'srfo_sp', 'cc'): -2.2,
-            ('fg', 'cc', 'fg_sink'): 0.01965,
-            ('pg_prod', 'pg_tk', 'pg_out'): 45.36,
-            ('rg_prod', 'rg_tk', 'rg_out'): 43.68,
-            ('df_prod', 'df_tk', 'df_out'): 40.32,
-            ('fo_prod', 'fo_tk', 'fo_out'): 13.14,
-            ('srn', 'srn_sp', 'srn_tk'): -0.5,  # NEW
-            ('rfg', 'rf', 'rfg_tk'): -0.5,  # NEW
-            ('ccg', 'cc', 'ccg_tk'): -0.5,  # NEW
-            ('ccfo', 'cc', 'ccfo_tk'): -0.5  # NEW
-        }
-
-        # dictionary of each split origin (key) and the respective split streams (values)
-        self.splitpoint_dict = {
-            ('srg', 'ad', 'srg_sp'): {('srg', 'srg_sp', 'pg_tk'), ('srg', 'srg_sp', 'rg_tk')},
-            ('srn', 'ad', 'srn_sp'): {('srn', 'srn_sp', 'rf'), ('srn', 'srn_sp', 'pg_tk'), ('srn', 'srn_sp', 'rg_tk'), ('srn', 'srn_sp', 'df_tk'), ('srn', 'srn_sp', 'srn_tk')},
-            ('srds', 'ad', 'srds_sp'): {('srds', 'srds_sp', 'cc'), ('srds', 'srds_sp', 'df_tk'), ('srds', 'srds_sp', 'fo_tk')},
-            ('srfo', 'ad', 'srfo_sp'): {('srfo', 'srfo_sp', 'cc'), ('srfo', 'srfo_sp', 'df_tk'), ('srfo', 'srfo_sp', 'fo_tk')},
-            ('rfg', 'rf', 'rfg_sp'): {('rfg', 'rfg_sp', 'pg_tk'), ('rfg', 'rfg_sp', 'rg_tk')},
-            ('rfg', 'rfg_tk', 'rfg_sp'): {('rfg', 'rfg_sp', 'pg_tk'), ('rfg', 'rfg_sp', 'rg_tk')},  # NEW
-            ('ccg', 'cc', 'ccg_sp'): {('ccg', 'ccg_sp', 'pg_tk'), ('ccg', 'ccg_sp', 'rg_tk')},
-            ('ccg', 'ccg_tk', 'ccg_sp'): {('ccg', 'ccg_sp', 'pg_tk'), ('ccg', 'ccg_sp', 'rg_tk')},  # NEW
-            ('ccfo', 'cc', 'ccfo_sp'): {('ccfo', 'ccfo_sp', 'df_tk'), ('ccfo', 'ccfo_sp', 'fo_tk')},
-            ('ccfo', 'ccfo_tk', 'ccfo_sp'): {('ccfo', 'ccfo_sp', 'df_tk'), ('ccfo', 'ccfo_sp', 'fo_tk')}  # NEW
-        }
-
-        # assign the timeperiods to the splitpoints
-        self.splitpoint_dict_mp = {}
-        for t in range(1, self.timehorizon+1, 1):
-            for i in self.splitpoint_dict:
-                self.splitpoint_dict_mp[(i + (t,))] = {(j + (t,)) for j in self.splitpoint_dict[i]}
-
-        # product demand data
-        self.product_demand_data = {
-            ('pg_prod', 'pg_tk', 'pg_out'): 10000,
-            ('rg_prod', 'rg_tk', 'rg_out'): 10000,
-            ('df_prod', 'df_tk', 'df_out'): 10000,
-            ('fo_prod', 'fo_tk', 'fo_out'): 10000
-        }
-
-        # yield coefficients for each unit operation
-        # Atmospheric Distillation
-        self.ad_yield_coef = {
-            ('fg', 'ad', 'fg_sink'): 35.42,
-            ('srg', 'ad', 'srg_sp'): 0.270,
-            ('srn', 'ad', 'srn_sp'): 0.237,
-            ('srds', 'ad', 'srds_sp'): 0.087,
-            ('srfo', 'ad', 'srfo_sp'): 0.372
-        }
-
-        # Reformer
-        self.rf_yield_coef = {
-            ('fg', 'rf', 'fg_sink'): 158.7,
-            ('rfg', 'rf', 'rfg_sp'): 0.928
-        }
-
-        # Catalytic Cracker for SRDS Feed
-        self.cc_srds_yield_coef = {
-            ('fg', 'cc', 'fg_sink'): 336.9,
-            ('ccg', 'cc', 'ccg_sp'): 0.619,
-            ('ccfo', 'cc', 'ccfo_sp'): 0.189
-        }
-
-        # Catalytic Cracker for SRFO Feed
-        self.cc_srfo_yield_coef = {
-            ('fg', 'cc', 'fg_sink'): 386.4,
-            ('ccg', 'cc', 'ccg_sp'): 0.688,
-            ('ccfo', 'cc', 'ccfo_sp'): 0.2197
-        }
-
-        # Feed Properties for Blending
-        # Octane Ratings
-        self.pg_octane_data = {
-            ('srg', 'srg_sp', 'pg_tk'): 78.5,
-            ('rfg', 'rfg_sp', 'pg_tk'): 104,
-            ('srn', 'srn_sp', 'pg_tk'): 65,
-            ('ccg', 'ccg_sp', 'pg_tk'): 93.7
-        }
-        self.rg_octane_data = {
-            ('srg', 'srg_sp', 'rg_tk'): 78.5,
-            ('rfg', 'rfg_sp', 'rg_tk'): 104,
-            ('srn', 'srn_sp', 'rg_tk'): 65,
-            ('ccg', 'ccg_sp', 'rg_tk'): 93.7
-        }
-
-        # Vapour Pressures
-        self.pg_vpress_data = {
-            ('srg', 'srg_sp', 'pg_tk'): 18.4,
-            ('rfg', 'rfg_sp', 'pg_tk'): 2.57,
-            ('srn', 'srn_sp', 'pg_tk'): 6.54,
-            ('ccg', 'ccg_sp', 'pg_tk'): 6.9
-        }
-        self.rg_vpress_data = {
-            ('srg', 'srg_sp', 'rg_tk'): 18.4,
-            ('rfg', 'rfg_sp', 'rg_tk'): 2.57,
-            ('srn', 'srn_sp', 'rg_tk'): 6.54,
-            ('ccg', 'ccg_sp', 'rg_tk'): 6.9
-        }
-
-        # Densities
-        self.df_density_data = {
-            ('srn', 'srn_sp', 'df_tk'): 272,
-            ('ccfo', 'ccfo_sp', 'df_tk'): 294.4,
-            ('srds', 'srds_sp', 'df_tk'): 292,
-            ('srfo', 'srfo_sp', 'df_tk'): 295
-        }
-        self.fo_density_data = {
-            ('ccfo', 'ccfo_sp', 'fo_tk'): 294.4,
-            ('srds', 'srds_sp', 'fo_tk'): 292,
-            ('srfo', 'srfo_sp', 'fo_tk'): 295
-        }
-
-        # Sulfur Concentrations
-        self.df_sulfur_data = {
-            ('srn', 'srn_sp', 'df_tk'): 0.283,
-            ('ccfo', 'ccfo_sp', 'df_tk'): 0.353,
-            ('srds', 'srds_sp', 'df_tk'): 0.526,
-            ('srfo', 'srfo_sp', 'df_tk'): 0.980
-        }
-        self.fo_sulfur_data = {
-            ('ccfo', 'ccfo_sp', 'fo_tk'): 0.353,
-            ('srds', 'srds_sp', 'fo_tk'): 0.526,
-            ('srfo', 'srfo_sp', 'fo_tk'): 0.980
+        # unique unit pairs (sorted for a fixed order), the material/unit-pair flow streams, and the cost stream keys, computed once from the data
+        self.unitpairs = tuple(sorted(frozenset().union(*self.map_to_units.values())))
+        self.flowpairs = tuple((m,) + u for m, units in self.map_to_units.items() for u in units)
+        self.cost_streams = tuple(self.cost_data)
+
+        # assign the timeperiods to the splitpoints (outlet streams stored as frozensets so they can key the reverse index)
+        self.splitpoint_dict_mp = {(i + (t,)): frozenset(j + (t,) for j in outlets) for t in self.timeperiods for i, outlets in self.splitpoint_dict.items()}
+
+        # outlet stream keys (with the timeperiod) of each splitpoint in a fixed order, used directly by the balance rule
+        self.splitpoint_outlets = {(i + (t,)): tuple(j + (t,) for j in outlets) for t in self.timeperiods for i, outlets in self.splitpoint_dict.items()}
+
+        # reverse index of the splitpoints - inlet streams that feed the same set of outlet streams
+        self.splitpoint_inlets = {}
+        for i, outlets in self.splitpoint_dict_mp.items():
+            self.splitpoint_inlets.setdefault(outlets, []).append(i)
+
+        # Blend quality tables - one row per blend component stream, one column per property (pg/rg: octane, vapour pressure; df/fo: density, sulfur)
+        self.blend_streams = {blend: tuple((mat, mat + '_sp', blend + '_tk') for mat in mats) for blend, mats in self.blend_materials.items()}
+        self.blend_quality = {
+            'pg': np.array([[self.gasoline_octane[mat], self.gasoline_vpress[mat]] for mat in self.blend_materials['pg']]),
+            'rg': np.array([[self.gasoline_octane[mat], self.gasoline_vpress[mat]] for mat in self.blend_materials['rg']]),
+            'df': np.array([[self.fuel_density[mat], self.fuel_sulfur[mat]] for mat in self.blend_materials['df']]),
+            'fo': np.array([[self.fuel_density[mat], self.fuel_sulfur[mat]] for mat in self.blend_materials['fo']])
         }
 
-        # Tank data
-        self.tank_height = {
-            'srn_tk': 10,
-            'rfg_tk': 10,
-            'ccg_tk': 10,
-            'ccfo_tk': 10
-        }
-        self.tank_radius = {
-            'srn_tk': 5,
-            'rfg_tk': 5,
-            'ccg_tk': 5,
-            'ccfo_tk': 5
-        }
-        self.tank_area = {
-            'srn_tk': (2*np.pi*self.tank_radius['srn_tk'] * self.tank_height['srn_tk'] + np.pi*self.tank_radius['srn_tk']**2),  # m2
-            'rfg_tk': (2*np.pi*self.tank_radius['rfg_tk'] * self.tank_height['rfg_tk'] + np.pi*self.tank_radius['rfg_tk']**2),  # m2
-            'ccg_tk': (2*np.pi*self.tank_radius['ccg_tk'] * self.tank_height['ccg_tk'] + np.pi*self.tank_radius['ccg_tk']**2),  # m2
-            'ccfo_tk': (2*np.pi*self.tank_radius['ccfo_tk'] * self.tank_height['ccfo_tk'] + np.pi*self.tank_radius['ccfo_tk']**2)  # m2
-        }
-        self.bbl_to_m3 = 0.158  # 0.158m3/bbl
-        self.tank_list = ['srn_tk', 'rfg_tk', 'ccg_tk', 'ccfo_tk']
-        self.tank_in_dict = {
-            'srn_tk': [('srn', 'srn_sp', 'srn_tk')],
-            'rfg_tk': [('rfg', 'rf', 'rfg_tk')],
-            'ccg_tk': [('ccg', 'cc', 'ccg_tk')],
-            'ccfo_tk': [('ccfo', 'cc', 'ccfo_tk')]
-        }
-        self.tank_out_dict = {
-            'srn_tk': [('srn', 'srn_tk', 'rf')],
-            'rfg_tk': [('rfg', 'rfg_tk', 'rfg_sp')],
-            'ccg_tk': [('ccg', 'ccg_tk', 'ccg_sp')],
-            'ccfo_tk': [('ccfo', 'ccfo_tk', 'ccfo_sp')]
-        }
-        self.tank_holding_cost_data = {
-            'srn_tk': 1.5,
-            'rfg_tk': 1.5,
-            'ccg_tk': 1.5,
-            'ccfo_tk': 1.5
-        }
+        # Tank surface areas (2*pi*r*h + pi*r^2, computed for all tanks at once)
+        radius = np.array([self.tank_radius[tank] for tank in self.tank_list])
+        height = np.array([self.tank_height[tank] for tank in self.tank_list])
+        self.tank_area = dict(zip(self.tank_list, (2*np.pi*radius*height + np.pi*radius**2).tolist()))  # m2
 
-    def build_model(self):
+    def build_model(self, debug=False):
         """
         Build the optimization model with constraints and objectives.
-        Returns the Pyomo model object for solving.
+        Returns the Pyomo model object for solving. Set debug to print the built model.
         """
 
         """        
@@ -235,22 +243,23 @@ class RefineryModel:
         ===============================================================================
         """
 
-        # Create abstract model
-        model = pyomo.AbstractModel()
+        # Create concrete model (all data is known up front, so the sets and parameters are populated directly)
+        model = pyomo.ConcreteModel()
 
         # Define main sets
         # streams = material streams
-        model.materials = pyomo.Set()
+        model.materials = pyomo.Set(initialize=['crude', 'srg', 'srn', 'srds', 'srfo', 'rfg', 'ccg', 'ccfo', 'fg', 'pg_prod', 'rg_prod', 'df_prod', 'fo_prod'], dimen=1)
 
         # time periods
-        model.timeperiods = pyomo.Set(initialize=pyomo.RangeSet(1, self.timehorizon, 1))
+        model.timeperiods = pyomo.Set(initialize=self.timeperiods, dimen=1)
 
         # unitpairs = combinations of units where the streams are leaving and entering
-        model.unitpairs = pyomo.Set()
+        # unitpairs is a set of tuples for each specified combination (e.g. {('ad', 'pg'), ('ad', 'cc'), ...})
+        model.unitpairs = pyomo.Set(initialize=self.unitpairs, dimen=2)
 
         # combination of the materials to the unit pairs using the map dictionary
         # initialize statement creates a list of triplet sets of the key to the value pairs (e.g. [('srg', 'ad', 'pg'), ('srg', 'ad', 'rg'), ...])
-        model.flowpairs = pyomo.Set(within=model.materials * model.unitpairs * model.timeperiods, initialize=[(m, u, t) for m in self.map_to_units for u in self.map_to_units[m] for t in pyomo.RangeSet(1, self.timehorizon, 1)])
+        model.flowpairs = pyomo.Set(within=model.materials * model.unitpairs * model.timeperiods, initialize=[f + (t,) for f in self.flowpairs for t in self.timeperiods], dimen=4)
 
         # Elements used to create the splitpoints set
         """
@@ -258,68 +267,60 @@ class RefineryModel:
         sp_uout = unit that material is leaving from
         sp_uin = splitpoint node that the material is entering
         """
-        model.sp_materials = pyomo.Set(initialize=(i for (i, j, k, t) in self.splitpoint_dict_mp))
-        model.sp_uout = pyomo.Set(initialize=(j for (i, j, k, t) in self.splitpoint_dict_mp))
-        model.sp_uin = pyomo.Set(initialize=(k for (i, j, k, t) in self.splitpoint_dict_mp))
+        model.sp_materials = pyomo.Set(initialize=(i for (i, j, k, t) in self.splitpoint_dict_mp), dimen=1)
+        model.sp_uout = pyomo.Set(initialize=(j for (i, j, k, t) in self.splitpoint_dict_mp), dimen=1)
+        model.sp_uin = pyomo.Set(initialize=(k for (i, j, k, t) in self.splitpoint_dict_mp), dimen=1)
 
         # Splitpoints Set - set as the splitpoint_dict_mp keys
-        model.splitpoint_set = pyomo.Set(within=model.sp_materials * model.sp_uout * model.sp_uin * model.timeperiods, initialize=list(self.splitpoint_dict_mp.keys()))
+        model.splitpoint_set = pyomo.Set(within=model.sp_materials * model.sp_uout * model.sp_uin * model.timeperiods, initialize=list(self.splitpoint_dict_mp.keys()), dimen=4)
 
         # Set for the cost streams
-        model.cost_set = pyomo.Set(initialize=list(self.cost_data.keys()))
+        model.cost_set = pyomo.Set(initialize=self.cost_streams, dimen=3)
 
         # Flow rate variable
         model.x = pyomo.Var(model.flowpairs, domain=pyomo.NonNegativeReals)
 
-        # data to fill the materials and unitpairs sets
-        # unitpairs is a set of tuples for each specified combination (e.g. {('ad', 'pg'), ('ad', 'cc'), ...})
-        data = {None: {
-            'materials': {None: ['crude', 'srg', 'srn', 'srds', 'srfo', 'rfg', 'ccg', 'ccfo', 'fg', 'pg_prod', 'rg_prod', 'df_prod', 'fo_prod']},
-            'unitpairs': {None: set(itertools.chain.from_iterable(self.map_to_units.values()))}
-        }}
+        # plain dict of the flow variable data, so the rules below index a dict instead of going through the IndexedVar lookup
+        flows = dict(model.x.items())
 
-        # Parameter for shutdown binary alpha
-        model.alpha = pyomo.Param(self.alpha_param.keys(), initialize=self.alpha_param, mutable=True)
+        # Parameter for shutdown binary alpha (mutable so scenarios only update the values, no model rebuild)
+        model.alpha = pyomo.Param(self.alpha_param.keys(), initialize=self.alpha_param, within=pyomo.Binary, mutable=True)
 
         # Parameter for cost streams
         model.costs = pyomo.Param(model.cost_set, initialize=self.cost_data)
 
         # Yields
         # Sets
-        model.ad_outflows = pyomo.Set(initialize=[('fg', 'ad', 'fg_sink'), ('srg', 'ad', 'srg_sp'), ('srn', 'ad', 'srn_sp'), ('srds', 'ad', 'srds_sp'), ('srfo', 'ad', 'srfo_sp')])
-        model.rf_outflows = pyomo.Set(initialize=[('fg', 'rf', 'fg_sink'), ('rfg', 'rf', 'rfg_sp')])
-        model.cc_outflows = pyomo.Set(initialize=[('fg', 'cc', 'fg_sink'), ('ccg', 'cc', 'ccg_sp'), ('ccfo', 'cc', 'ccfo_sp')])
-
-        # Parameters
-        model.ad_yield_coef = pyomo.Param(model.ad_outflows, initialize=self.ad_yield_coef)
-        model.rf_yield_coef = pyomo.Param(model.rf_outflows, initialize=self.rf_yield_coef)
-        model.cc_srds_yield_coef = pyomo.Param(model.cc_outflows, initialize=self.cc_srds_yield_coef)
-        model.cc_srfo_yield_coef = pyomo.Param(model.cc_outflows, initialize=self.cc_srfo_yield_coef)
+        model.ad_outflows = pyomo.Set(initialize=[('fg', 'ad', 'fg_sink'), ('srg', 'ad', 'srg_sp'), ('srn', 'ad', 'srn_sp'), ('srds', 'ad', 'srds_sp'), ('srfo', 'ad', 'srfo_sp')], dimen=3)
+        model.rf_outflows = pyomo.Set(initialize=[('fg', 'rf', 'fg_sink'), ('rfg', 'rf', 'rfg_sp')], dimen=3)
+        model.cc_outflows = pyomo.Set(initialize=[('fg', 'cc', 'fg_sink'), ('ccg', 'cc', 'ccg_sp'), ('ccfo', 'cc', 'ccfo_sp')], dimen=3)
 
         # Demand
-        model.product_set = pyomo.Set(initialize=[('pg_prod', 'pg_tk', 'pg_out'), ('rg_prod', 'rg_tk', 'rg_out'), ('df_prod', 'df_tk', 'df_out'), ('fo_prod', 'fo_tk', 'fo_out')])
-        model.product_demand_numbers = pyomo.Param(model.product_set, initialize=self.product_demand_data)
+        model.product_set = pyomo.Set(initialize=[('pg_prod', 'pg_tk', 'pg_out'), ('rg_prod', 'rg_tk', 'rg_out'), ('df_prod', 'df_tk', 'df_out'), ('fo_prod', 'fo_tk', 'fo_out')], dimen=3)
 
         # Blend Tank Balance Sets
-        model.pg_set = pyomo.Set(initialize=[('srg', 'srg_sp', 'pg_tk'), ('rfg', 'rfg_sp', 'pg_tk'), ('srn', 'srn_sp', 'pg_tk'), ('ccg', 'ccg_sp', 'pg_tk')])
-        model.rg_set = pyomo.Set(initialize=[('srg', 'srg_sp', 'rg_tk'), ('rfg', 'rfg_sp', 'rg_tk'), ('srn', 'srn_sp', 'rg_tk'), ('ccg', 'ccg_sp', 'rg_tk')])
-        model.df_set = pyomo.Set(initialize=[('srn', 'srn_sp', 'df_tk'), ('ccfo', 'ccfo_sp', 'df_tk'), ('srds', 'srds_sp', 'df_tk'), ('srfo', 'srfo_sp', 'df_tk')])
-        model.fo_set = pyomo.Set(initialize=[('ccfo', 'ccfo_sp', 'fo_tk'), ('srds', 'srds_sp', 'fo_tk'), ('srfo', 'srfo_sp', 'fo_tk')])
-
-        # Quality Constraint Parameters
-        model.pg_octane_rating = pyomo.Param(model.pg_set, initialize=self.pg_octane_data)
-        model.pg_vpress_rating = pyomo.Param(model.pg_set, initialize=self.pg_vpress_data)
-        model.rg_octane_rating = pyomo.Param(model.rg_set, initialize=self.rg_octane_data)
-        model.rg_vpress_rating = pyomo.Param(model.rg_set, initialize=self.rg_vpress_data)
-        model.df_density_spec = pyomo.Param(model.df_set, initialize=self.df_density_data)
-        model.df_sulfur_spec = pyomo.Param(model.df_set, initialize=self.df_sulfur_data)
-        model.fo_density_spec = pyomo.Param(model.fo_set, initialize=self.fo_density_data)
-        model.fo_sulfur_spec = pyomo.Param(model.fo_set, initialize=self.fo_sulfur_data)
+        model.pg_set = pyomo.Set(initialize=self.blend_streams['pg'], dimen=3)
+        model.rg_set = pyomo.Set(initialize=self.blend_streams['rg'], dimen=3)
+        model.df_set = pyomo.Set(initialize=self.blend_streams['df'], dimen=3)
+        model.fo_set = pyomo.Set(initialize=self.blend_streams['fo'], dimen=3)
+
+        # Quality Constraint Parameters (columns of the blend quality tables)
+        def quality_data(blend, column):
+            return dict(zip(self.blend_streams[blend], self.blend_quality[blend][:, column].tolist()))
+
+        model.pg_octane_rating = pyomo.Param(model.pg_set, initialize=quality_data('pg', 0))
+        model.pg_vpress_rating = pyomo.Param(model.pg_set, initialize=quality_data('pg', 1))
+        model.rg_octane_rating = pyomo.Param(model.rg_set, initialize=quality_data('rg', 0))
+        model.rg_vpress_rating = pyomo.Param(model.rg_set, initialize=quality_data('rg', 1))
+        model.df_density_spec = pyomo.Param(model.df_set, initialize=quality_data('df', 0))
+        model.df_sulfur_spec = pyomo.Param(model.df_set, initialize=quality_data('df', 1))
+        model.fo_density_spec = pyomo.Param(model.fo_set, initialize=quality_data('fo', 0))
+        model.fo_sulfur_spec = pyomo.Param(model.fo_set, initialize=quality_data('fo', 1))
 
         # Tanks
-        model.tank_set = pyomo.Set(initialize=self.tank_list)
-        model.tank_in_set = pyomo.Set(model.tank_set, initialize=self.tank_in_dict)
-        model.tank_out_set = pyomo.Set(model.tank_set, initialize=self.tank_out_dict)
+        model.tank_set = pyomo.Set(initialize=self.tank_list, dimen=1)
+        model.tank_in_set = pyomo.Set(model.tank_set, initialize=self.tank_in_dict, dimen=3)
+        model.tank_out_set = pyomo.Set(model.tank_set, initialize=self.tank_out_dict, dimen=3)
         model.tank_holding_cost = pyomo.Param(self.tank_holding_cost_data.keys(), initialize=self.tank_holding_cost_data)
         model.m = pyomo.Var(model.tank_set, model.timeperiods, domain=pyomo.NonNegativeReals)
 
@@ -330,7 +331,13 @@ class RefineryModel:
         """
         # Objective Function (profit = products - operating cost - crude cost)
         def profit_objective(model):
-            return sum(model.x[c, t] * model.costs[c] for c in model.costs for t in model.timeperiods) - sum(model.tank_holding_cost[tank] * model.m[tank, t] for tank in model.tank_set for t in model.timeperiods)
+            x, m, holding_cost = flows, model.m, self.tank_holding_cost_data
+            # iterate the cost values directly instead of indexing the costs param for every term
+            costs = model.costs.extract_values()
+            # build the objective as one flat linear expression (stream costs, then the negated tank holding costs)
+            coefs = [cost for cost in costs.values() for t in model.timeperiods] + [-holding_cost[tank] for tank in model.tank_set for t in model.timeperiods]
+            variables = [x[c + (t,)] for c in costs for t in model.timeperiods] + [m[tank, t] for tank in model.tank_set for t in model.timeperiods]
+            return LinearExpression(constant=0, linear_coefs=coefs, linear_vars=variables)
 
         model.objectivefunction = pyomo.Objective(rule=profit_objective, sense=pyomo.maximize)
 
@@ -342,55 +349,53 @@ class RefineryModel:
 
         # Splitpoint Balances
         def splitpoint_balance(model, mat, uout, uin, t):
-            # get the outlet streams of the current originating splitpoint
-            sp_outlets = self.splitpoint_dict_mp[mat, uout, uin, t]
-
-            # loop through the sp inlet streams - if any inlet streams share the same outlet streams, then add to list
-            inlet_stream_list = []
-            for i in self.splitpoint_dict_mp:
-                if self.splitpoint_dict_mp[i] == sp_outlets:
-                    inlet_stream_list.append(i)
+            x = flows
+            # get the inlet streams that share the outlet streams of the current originating splitpoint
+            inlet_stream_list = self.splitpoint_inlets[self.splitpoint_dict_mp[mat, uout, uin, t]]
 
             # sum of flows into a splitpoint node are equal to the sum of flows out of a node
-            return sum(model.x[j] for j in inlet_stream_list) - sum(model.x[a, b, c, t] for (a, b, c) in self.splitpoint_dict[mat, uout, uin]) == 0
+            return sum(x[j] for j in inlet_stream_list) == sum(x[k] for k in self.splitpoint_outlets[mat, uout, uin, t])
         model.splitpoint_volbalance = pyomo.Constraint(model.splitpoint_set, rule=splitpoint_balance)
 
-        # Capacity Equations
-        def ad_crude_limit(model, t):
-            return model.x['crude', 'crude_source', 'ad', t] <= 110000
-
-        def ad_capacity(model, t):
-            return model.x['crude', 'crude_source', 'ad', t] <= 100000 * (1 - model.alpha['ad', t])
+        # Unit Feeds (total feed into the reformer and catalytic cracker, shared by the capacity and yield equations)
+        def rf_feed(model, t):
+            return flows['srn', 'srn_sp', 'rf', t] + flows['srn', 'srn_tk', 'rf', t]
 
-        def rf_capacity(model, t):
-            return (model.x['srn', 'srn_sp', 'rf', t] + model.x['srn', 'srn_tk', 'rf', t]) <= 25000 * (1 - model.alpha['rf', t])
+        def cc_feed(model, t):
+            return flows['srds', 'srds_sp', 'cc', t] + flows['srfo', 'srfo_sp', 'cc', t]
 
-        def cc_capacity(model, t):
-            return (model.x['srds', 'srds_sp', 'cc', t] + model.x['srfo', 'srfo_sp', 'cc', t]) <= 30000 * (1 - model.alpha['cc', t])
+        model.rf_feed = pyomo.Expression(model.timeperiods, rule=rf_feed)
+        model.cc_feed = pyomo.Expression(model.timeperiods, rule=cc_feed)
 
-        # Capacity Constraints
-        model.crudecap = pyomo.Constraint(model.timeperiods, rule=ad_crude_limit)
-        model.adcap = pyomo.Constraint(model.timeperiods, rule=ad_capacity)
-        model.rfcap = pyomo.Constraint(model.timeperiods, rule=rf_capacity)
-        model.cccap = pyomo.Constraint(model.timeperiods, rule=cc_capacity)
+        # Capacity Constraints (unit capacity is zero while the unit is shut down, i.e. alpha = 1)
+        # the 110,000 crude supply limit is not added - the 100,000 AD capacity on the same flow always dominates it
+        model.capacity = pyomo.ConstraintList()
+        x, alpha = flows, model.alpha
+        for t in model.timeperiods:
+            model.capacity.add(x['crude', 'crude_source', 'ad', t] <= 100000 * (1 - alpha['ad', t]))
+            model.capacity.add(model.rf_feed[t] <= 25000 * (1 - alpha['rf', t]))
+            model.capacity.add(model.cc_feed[t] <= 30000 * (1 - alpha['cc', t]))
 
-        # Yield Equations
+        # Yield Equations (coefficients read from the plain data dicts)
         def ad_yield(model, mat, uout, uin, t):
-            return model.x[mat, uout, uin, t] == model.x['crude', 'crude_source', 'ad', t] * model.ad_yield_coef[mat, uout, uin]
+            x = flows
+            return x[mat, uout, uin, t] == x['crude', 'crude_source', 'ad', t] * self.ad_yield_coef[mat, uout, uin]
 
         def rf_yield(model, mat, uout, uin, t):
+            x = flows
             if mat == 'rfg':
-                return model.x[mat, uout, uin, t] + model.x[mat, 'rf', 'rfg_tk', t] == model.x['srn', 'srn_sp', 'rf', t] * model.rf_yield_coef[mat, uout, uin] + model.x['srn', 'srn_tk', 'rf', t] * model.rf_yield_coef[mat, uout, uin]
+                return x[mat, uout, uin, t] + x[mat, 'rf', 'rfg_tk', t] == model.rf_feed[t] * self.rf_yield_coef[mat, uout, uin]
             else:
-                return model.x[mat, uout, uin, t] == model.x['srn', 'srn_sp', 'rf', t] * model.rf_yield_coef[mat, uout, uin] + model.x['srn', 'srn_tk', 'rf', t] * model.rf_yield_coef[mat, uout, uin]
+                return x[mat, uout, uin, t] == model.rf_feed[t] * self.rf_yield_coef[mat, uout, uin]
 
         def cc_yield(model, mat, uout, uin, t):
+            x = flows
             if mat == 'ccg':
-                return model.x[mat, uout, uin, t] + model.x[mat, 'cc', 'ccg_tk', t] == model.x['srds', 'srds_sp', 'cc', t] * model.cc_srds_yield_coef[mat, uout, uin] + model.x['srfo', 'srfo_sp', 'cc', t] * model.cc_srfo_yield_coef[mat, uout, uin]
+                return x[mat, uout, uin, t] + x[mat, 'cc', 'ccg_tk', t] == x['srds', 'srds_sp', 'cc', t] * self.cc_srds_yield_coef[mat, uout, uin] + x['srfo', 'srfo_sp', 'cc', t] * self.cc_srfo_yield_coef[mat, uout, uin]
             elif mat == 'ccfo':
-                return model.x[mat, uout, uin, t] + model.x[mat, 'cc', 'ccfo_tk', t] == model.x['srds', 'srds_sp', 'cc', t] * model.cc_srds_yield_coef[mat, uout, uin] + model.x['srfo', 'srfo_sp', 'cc', t] * model.cc_srfo_yield_coef[mat, uout, uin]
+                return x[mat, uout, uin, t] + x[mat, 'cc', 'ccfo_tk', t] == x['srds', 'srds_sp', 'cc', t] * self.cc_srds_yield_coef[mat, uout, uin] + x['srfo', 'srfo_sp', 'cc', t] * self.cc_srfo_yield_coef[mat, uout, uin]
             else:
-                return model.x[mat, uout, uin, t] == model.x['srds', 'srds_sp', 'cc', t] * model.cc_srds_yield_coef[mat, uout, uin] + model.x['srfo', 'srfo_sp', 'cc', t] * model.cc_srfo_yield_coef[mat, uout, uin]
+                return x[mat, uout, uin, t] == x['srds', 'srds_sp', 'cc', t] * self.cc_srds_yield_coef[mat, uout, uin] + x['srfo', 'srfo_sp', 'cc', t] * self.cc_srfo_yield_coef[mat, uout, uin]
 
         # Yield Constraints
         model.ad_output = pyomo.Constraint(model.ad_outflows, model.timeperiods, rule=ad_yield)
@@ -399,63 +404,31 @@ class RefineryModel:
 
         # Demand Equations and Constraints
         def product_demand(model, mat, uout, uin, t):
-            return model.x[mat, uout, uin, t] >= model.product_demand_numbers[mat, uout, uin]
+            return flows[mat, uout, uin, t] >= self.product_demand_data[mat, uout, uin]
 
         model.product_demand = pyomo.Constraint(model.product_set, model.timeperiods, rule=product_demand)
 
-        # Blend Tank Balance Equations
-        def pg_balance(model, t):
-            return model.x['pg_prod', 'pg_tk', 'pg_out', t] == sum(model.x[mat, uout, uin, t] for (mat, uout, uin) in model.pg_set)
-
-        def rg_balance(model, t):
-            return model.x['rg_prod', 'rg_tk', 'rg_out', t] == sum(model.x[mat, uout, uin, t] for (mat, uout, uin) in model.rg_set)
-
-        def df_balance(model, t):
-            return model.x['df_prod', 'df_tk', 'df_out', t] == sum(model.x[mat, uout, uin, t] for (mat, uout, uin) in model.df_set)
-
-        def fo_balance(model, t):
-            return model.x['fo_prod', 'fo_tk', 'fo_out', t] == sum(model.x[mat, uout, uin, t] for (mat, uout, uin) in model.fo_set)
-
-        # Blend Tank Balance Constraints
-        model.pg_blend = pyomo.Constraint(model.timeperiods, rule=pg_balance)
-        model.rg_blend = pyomo.Constraint(model.timeperiods, rule=rg_balance)
-        model.df_blend = pyomo.Constraint(model.timeperiods, rule=df_balance)
-        model.fo_blend = pyomo.Constraint(model.timeperiods, rule=fo_balance)
-
-        # Product Quality Equations
-        def pg_octane(model, t):
-            return sum(model.x[mat, uout, uin, t] * model.pg_octane_rating[mat, uout, uin] for (mat, uout, uin) in model.pg_set) - 93 * model.x['pg_prod', 'pg_tk', 'pg_out', t] >= 0
-
-        def pg_vpress(model, t):
-            return sum(model.x[mat, uout, uin, t] * model.pg_vpress_rating[mat, uout, uin] for (mat, uout, uin) in model.pg_set) - 12.7 * model.x['pg_prod', 'pg_tk', 'pg_out', t] <= 0
-
-        def rg_octane(model, t):
-            return sum(model.x[mat, uout, uin, t] * model.rg_octane_rating[mat, uout, uin] for (mat, uout, uin) in model.rg_set) - 83 * model.x['rg_prod', 'rg_tk', 'rg_out', t] >= 0
-
-        def rg_vpress(model, t):
-            return sum(model.x[mat, uout, uin, t] * model.rg_vpress_rating[mat, uout, uin] for (mat, uout, uin) in model.rg_set) - 12.7 * model.x['rg_prod', 'rg_tk', 'rg_out', t] <= 0
-
-        def df_density(model, t):
-            return sum(model.x[mat, uout, uin, t] * model.df_density_spec[mat, uout, uin] for (mat, uout, uin) in model.df_set) - 306 * model.x['df_prod', 'df_tk', 'df_out', t] <= 0
-
-        def df_sulfur(model, t):
-            return sum(model.x[mat, uout, uin, t] * model.df_sulfur_spec[mat, uout, uin] for (mat, uout, uin) in model.df_set) - 0.50 * model.x['df_prod', 'df_tk', 'df_out', t] <= 0
+        # Blend Tank Balance Equation (product flow equals the sum of the component flows), one flat linear expression per blend and timeperiod
+        def blend_balance(blend, model, t):
+            x = flows
+            components = [x[stream + (t,)] for stream in self.blend_streams[blend]]
+            return LinearExpression(constant=0, linear_coefs=[1.0] * len(components) + [-1.0], linear_vars=components + [x[self.blend_products[blend] + (t,)]]) == 0
 
-        def fo_density(model, t):
-            return sum(model.x[mat, uout, uin, t] * model.fo_density_spec[mat, uout, uin] for (mat, uout, uin) in model.fo_set) - 352 * model.x['fo_prod', 'fo_tk', 'fo_out', t] <= 0
+        # Blend Tank Balance Constraints (e.g. model.pg_blend)
+        for blend in self.blend_products:
+            setattr(model, blend + '_blend', pyomo.Constraint(model.timeperiods, rule=functools.partial(blend_balance, blend)))
 
-        def fo_sulfur(model, t):
-            return sum(model.x[mat, uout, uin, t] * model.fo_sulfur_spec[mat, uout, uin] for (mat, uout, uin) in model.fo_set) - 3.0 * model.x['fo_prod', 'fo_tk', 'fo_out', t] <= 0
+        # Product Quality Equation (sum of component flows * quality against limit * product flow), shared by all specs
+        def quality_rule(blend, column, limit, sense, model, t):
+            x = flows
+            coefs = self.blend_quality[blend][:, column].tolist()
+            quality = LinearExpression(constant=0, linear_coefs=coefs, linear_vars=[x[stream + (t,)] for stream in self.blend_streams[blend]])
+            product_limit = limit * x[self.blend_products[blend] + (t,)]
+            return quality >= product_limit if sense == '>=' else quality <= product_limit
 
-        # Product Quality Constraints
-        model.pg_octane_req = pyomo.Constraint(model.timeperiods, rule=pg_octane)
-        model.pg_vpress_req = pyomo.Constraint(model.timeperiods, rule=pg_vpress)
-        model.rg_octane_req = pyomo.Constraint(model.timeperiods, rule=rg_octane)
-        model.rg_vpress_req = pyomo.Constraint(model.timeperiods, rule=rg_vpress)
-        model.df_density_req = pyomo.Constraint(model.timeperiods, rule=df_density)
-        model.df_sulfur_req = pyomo.Constraint(model.timeperiods, rule=df_sulfur)
-        model.fo_density_req = pyomo.Constraint(model.timeperiods, rule=fo_density)
-        model.fo_sulfur_req = pyomo.Constraint(model.timeperiods, rule=fo_sulfur)
+        # Product Quality Constraints (e.g. model.pg_octane_req)
+        for name, blend, column, limit, sense in self.quality_specs:
+            setattr(model, name + '_req', pyomo.Constraint(model.timeperiods, rule=functools.partial(quality_rule, blend, column, limit, sense)))
 
         """
         ===============================================================================
@@ -465,10 +438,11 @@ class RefineryModel:
 
         # Tank Inventory Balance
         def tank_balance(model, tank, t):
+            x, m = flows, model.m
             if t == 1:
-                return (model.m[tank, t] - 0)/self.timedelta - sum(model.x[a, b, c, t] for (a, b, c) in model.tank_in_set[tank]) + sum(model.x[d, e, f, t] for (d, e, f) in model.tank_out_set[tank]) == 0
+                return (m[tank, t] - 0)/self.timedelta - sum(x[a, b, c, t] for (a, b, c) in model.tank_in_set[tank]) + sum(x[d, e, f, t] for (d, e, f) in model.tank_out_set[tank]) == 0
             else:
-                return (model.m[tank, t] - model.m[tank, t-1])/self.timedelta - sum(model.x[a, b, c, t] for (a, b, c) in model.tank_in_set[tank]) + sum(model.x[d, e, f, t] for (d, e, f) in model.tank_out_set[tank]) == 0
+                return (m[tank, t] - m[tank, t-1])/self.timedelta - sum(x[a, b, c, t] for (a, b, c) in model.tank_in_set[tank]) + sum(x[d, e, f, t] for (d, e, f) in model.tank_out_set[tank]) == 0
         model.tank_volbalance = pyomo.Constraint(model.tank_set, model.timeperiods, rule=tank_balance)
 
         # Tank Height Maximum
@@ -476,7 +450,8 @@ class RefineryModel:
             return model.m[tank, t] * self.bbl_to_m3 / self.tank_area[tank] <= self.tank_height[tank]
         model.tank_height_limit = pyomo.Constraint(model.tank_set, model.timeperiods, rule=tank_height)
 
-        # Create instance of model
-        instance = model.create_instance(data)
+        # Display instance information
+        if debug:
+            model.pprint()
 
-        return instance
+        return model